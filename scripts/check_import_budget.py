@@ -0,0 +1,137 @@
+"""
+Preveri, da zagon spletnega strežnika (src/app.py) ne uvozi modulov, ki so
+namenjeni le pripravi filmov (obdelava zvoka, podnapisi, prevajanje ...).
+
+Preverjanje je statično: sledimo uvozom na nivoju modulov (uvozi znotraj
+funkcij so leni in se ne štejejo) po vseh modulih iz mape src.
+
+Uporaba:
+    python scripts/check_import_budget.py [vstopna_datoteka ...]
+"""
+
+import ast
+import sys
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parent.parent / "src"
+DEFAULT_ENTRY_POINTS = ["app.py"]
+
+# Moduli, ki jih strežnik ob zagonu ne sme uvoziti
+FORBIDDEN_MODULES = [
+    "numba",
+    "scipy",
+    "matplotlib",
+    "torch",
+    "torchaudio",
+    "pysrt",
+    "chardet",
+    "langdetect",
+    "gemini_srt_translator",
+    "opensubtitlescom",
+    "google.cloud",
+    "playwright",
+    "pyautogui",
+    "yt_dlp",
+    "ffmpeg_normalize",
+    "movies_preparation.subtitles",
+    "movies_preparation.the_chosen_scrapper",
+    "movies_preparation.sloflix_downloader",
+]
+
+
+def module_path(name):
+    """Vrne pot do datoteke modula iz mape src ali None za zunanje module."""
+    base = SRC_ROOT.joinpath(*name.split("."))
+    if (base / "__init__.py").is_file():
+        return base / "__init__.py"
+    if base.with_suffix(".py").is_file():
+        return base.with_suffix(".py")
+    return None
+
+
+def package_of(name, path):
+    return name if path.name == "__init__.py" else name.rpartition(".")[0]
+
+
+def top_level_nodes(body):
+    """Vrne ukaze, ki se izvedejo ob uvozu modula (brez teles funkcij)."""
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if isinstance(node, ast.If) and "__main__" in ast.unparse(node.test):
+            continue
+        yield node
+        for field in ("body", "orelse", "finalbody"):
+            yield from top_level_nodes(getattr(node, field, []))
+        for handler in getattr(node, "handlers", []):
+            yield from top_level_nodes(handler.body)
+
+
+def imported_names(name, path):
+    """Vrne imena modulov, ki jih modul uvozi ob nalaganju."""
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    package = package_of(name, path)
+    for node in top_level_nodes(tree.body):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split(".")
+                parts = parts[: len(parts) - node.level + 1]
+                base = ".".join(p for p in parts + [node.module or ""] if p)
+            else:
+                base = node.module
+            yield base
+            for alias in node.names:
+                candidate = f"{base}.{alias.name}"
+                if module_path(candidate):
+                    yield candidate
+
+
+def with_parents(name):
+    """Uvoz a.b.c izvede tudi a in a.b."""
+    parts = name.split(".")
+    return [".".join(parts[: i + 1]) for i in range(len(parts))]
+
+
+def is_forbidden(name):
+    return any(
+        name == f or name.startswith(f + ".") for f in FORBIDDEN_MODULES
+    )
+
+
+def check(entry_point):
+    entry_path = SRC_ROOT / entry_point
+    entry_name = entry_path.stem
+    seen = {entry_name: None}
+    queue = [(entry_name, entry_path)]
+    violations = []
+
+    while queue:
+        name, path = queue.pop()
+        for imported in imported_names(name, path):
+            for module in with_parents(imported):
+                if module in seen:
+                    continue
+                seen[module] = name
+                if is_forbidden(module):
+                    violations.append(module)
+                path_of_module = module_path(module)
+                if path_of_module is not None:
+                    queue.append((module, path_of_module))
+
+    for module in violations:
+        chain = [module]
+        while seen.get(chain[-1]):
+            chain.append(seen[chain[-1]])
+        print(f"❌ {entry_point} uvozi {module}: {' <- '.join(chain)}")
+    return not violations
+
+
+if __name__ == "__main__":
+    entry_points = sys.argv[1:] or DEFAULT_ENTRY_POINTS
+    results = [check(entry) for entry in entry_points]
+    if not all(results):
+        sys.exit(1)
+    print(f"✅ Uvozi so v mejah: {', '.join(entry_points)}")
@@ -0,0 +1,132 @@
+"""
+Medpomnilnik za statistiko obiskov.
+
+`after_request` števcev (in vnosov v Redis vrste) ne piše neposredno v
+Redis, ampak jih doda v omejeno vrsto. Nit v ozadju jih v rednih
+presledkih združi (enaki ključi se seštejejo) in zapiše v enem cevovodu
+(pipeline). Če je vrsta polna ali
+Redis ni dosegljiv, se dogodki zavržejo in preštejejo v
+`stats:analytics` -> `dropped`, odziv strani pa nikoli ne čaka na Redis.
+"""
+
+import logging
+import queue
+import threading
+
+import redis
+
+log = logging.getLogger(__name__)
+
+DROPPED_KEY = "stats:analytics"
+
+
+class AnalyticsBuffer(threading.Thread):
+    """Nit, ki zbrane števce in vnose v vrste prenese v Redis."""
+
+    def __init__(self, client, interval=2.0, max_queue=10000, batch=1000):
+        super().__init__(name="analytics-flusher", daemon=True)
+        self.client = client
+        self.interval = interval
+        self.batch = batch
+        self.events = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def incr(self, key, field, amount=1, ttl=None):
+        """HINCRBY, ki se izvede ob naslednjem praznjenju vrste."""
+        self._put(("incr", key, field, amount, ttl))
+
+    def push(self, key, value, maxlen=None):
+        """RPUSH v seznam, ki ga po potrebi obreže na `maxlen` elementov."""
+        self._put(("push", key, value, maxlen))
+
+    def _put(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self._count_dropped(1)
+
+    def _count_dropped(self, count):
+        with self._dropped_lock:
+            self.dropped += count
+
+    def _take_dropped(self):
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def _drain(self):
+        events = []
+        while len(events) < self.batch:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def flush(self):
+        """Zapiše vse zbrane dogodke; vrne število obdelanih."""
+        processed = 0
+        while True:
+            events = self._drain()
+            dropped = self._take_dropped()
+            if not events and not dropped:
+                return processed
+
+            counters = {}
+            ttls = {}
+            pushes = {}
+            maxlens = {}
+            for event in events:
+                if event[0] == "incr":
+                    _, key, field, amount, ttl = event
+                    counters[key, field] = (
+                        counters.get((key, field), 0) + amount
+                    )
+                    if ttl:
+                        ttls[key] = ttl
+                else:
+                    _, key, value, maxlen = event
+                    pushes.setdefault(key, {})[value] = None
+                    if maxlen:
+                        maxlens[key] = maxlen
+
+            pipe = self.client.pipeline(transaction=False)
+            for (key, field), amount in counters.items():
+                pipe.hincrby(key, field, amount)
+            for key, ttl in ttls.items():
+                pipe.expire(key, ttl)
+            for key, values in pushes.items():
+                pipe.rpush(key, *values)
+                if key in maxlens:
+                    pipe.ltrim(key, -maxlens[key], -1)
+            if dropped:
+                pipe.hincrby(DROPPED_KEY, "dropped", dropped)
+            try:
+                pipe.execute()
+            except redis.RedisError as e:
+                log.error(f"❌ Napaka pri zapisovanju statistike: {e}")
+                self._count_dropped(len(events) + dropped)
+            else:
+                if dropped:
+                    log.warning(f"⚠️ Zavrženih {dropped} dogodkov statistike")
+
+            processed += len(events)
+            if len(events) < self.batch:
+                return processed
+
+    def _flush_logged(self):
+        """Napaka zavrže le trenutni paket dogodkov, nit pa teče naprej."""
+        try:
+            self.flush()
+        except Exception:
+            log.exception("❌ Napaka pri zapisovanju statistike")
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._flush_logged()
+        self._flush_logged()
+
+    def stop(self):
+        self._stop_event.set()
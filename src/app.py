@@ -1,10 +1,8 @@
-import json
+import atexit
 import logging
 import os
-import time
 from datetime import date, timedelta
 
-import requests
 from flask import Flask, redirect, render_template, request, session
 from flask_compress import Compress
 from flask_limiter import Limiter
@@ -13,6 +11,7 @@ from flask_login import LoginManager, current_user
 from flask_wtf.csrf import CSRFProtect
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from analytics import AnalyticsBuffer
 from blueprints import (
     MEMES_COUNT,
     MUSIC_COUNT,
@@ -23,14 +22,28 @@ from blueprints import (
     init_admin_bp,
     init_auth_bp,
     init_misc_bp,
-    load_blog_posts,
+    init_movies_bp,
     memes_bp,
     misc_bp,
     movies_bp,
     music_bp,
     seo_bp,
 )
-from utils import FLASK_ENV, User, redis_client, users
+from geolocation import (
+    GEO_QUEUE_KEY,
+    GEO_QUEUE_MAX,
+    GeolocationWorker,
+    queue_entry,
+)
+from log_buffer import install_log_buffer
+from utils import (
+    FLASK_ENV,
+    STATS_TTL,
+    User,
+    get_blog_posts,
+    redis_client,
+    users,
+)
 
 # Flask app setup
 app = Flask(__name__, static_url_path="/static", static_folder="static")
@@ -43,6 +56,8 @@ csrf = CSRFProtect(app)
 app.config["WTF_CSRF_TIME_LIMIT"] = None
 
 log = logging.getLogger(__name__)
+# Zadnji zapisi dnevnika za nadzorno ploščo se hranijo tudi v pomnilniku
+install_log_buffer()
 
 redis_host = os.getenv("REDIS_HOST")
 redis_port = int(os.getenv("REDIS_PORT", "6379"))
@@ -53,57 +68,18 @@ limiter = Limiter(
 )
 limiter.init_app(app)
 
-last_timeout_time = 0
-
+# Števci statistike se v Redis zapisujejo v ozadju
+analytics = AnalyticsBuffer(
+    redis_client,
+    interval=float(os.getenv("ANALYTICS_FLUSH_SECONDS", "2")),
+    max_queue=int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000")),
+)
+analytics.start()
+atexit.register(analytics.stop)
 
-def get_location_from_ip(ip):
-    """Get location info from IP address using ipinfo.io
-    (free tier: 50k requests/month)"""
-    global last_timeout_time
-    if FLASK_ENV != "production":
-        return {"country": "SI", "city": "Ljubljana", "region": "Unknown"}
-    if time.time() - last_timeout_time < 60 * 60:
-        return {
-            "country": "Unknown",
-            "city": "Unknown",
-            "region": "Unknown",
-        }
-    try:
-        # Using ipinfo.io instead of ipapi.co (free tier: 50k/month)
-        response = requests.get(f"https://ipinfo.io/{ip}/json", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if "error" in data:
-                log.warning(f"ipinfo.io error: {data}")
-                return {
-                    "country": "Unknown",
-                    "city": "Unknown",
-                    "region": "Unknown",
-                }
-            return {
-                "country": data.get("country", "Unknown"),
-                "city": data.get("city", "Unknown"),
-                "region": data.get("region", "Unknown"),
-                "geolocation": data.get("loc"),
-                "postal": data.get("postal"),
-            }
-        else:
-            if response.status_code == 429:
-                last_timeout_time = time.time()
-                log.warning("ipinfo.io rate limit exceeded")
-            else:
-                log.warning(
-                    f"ipinfo.io request failed"
-                    f" with status {response.status_code} and"
-                    f" response content: {response.text}"
-                )
-    except Exception as e:
-        if "timeout" in str(e).lower():
-            last_timeout_time = time.time()
-            log.error("ipinfo.io timeout")
-        else:
-            log.error(f"Error getting geolocation: {str(e)}")
-    return {"country": "Unknown", "city": "Unknown", "region": "Unknown"}
+# Lokacije obiskovalcev bloga se določajo v ozadju
+geolocation_worker = GeolocationWorker()
+geolocation_worker.start()
 
 
 # add variables to all template rendering
@@ -150,14 +126,13 @@ def log_response_info(response):
     )
 
     if response.status_code < 400:
-        redis_client.hincrby(
-            f"stats:monthly:{month}", request.method + " " + route, 1
-        )
+        analytics.incr(f"stats:monthly:{month}", request.method + " " + route)
 
-    key = f"stats:daily:{today}:{user_id}:{response.status}"
-    redis_client.hincrby(key, request.method + " " + route, 1)
-    if not redis_client.exists(key):
-        redis_client.expire(key, 2592000 * 3)
+    analytics.incr(
+        f"stats:daily:{today}:{user_id}:{response.status}",
+        request.method + " " + route,
+        ttl=STATS_TTL,
+    )
 
     if (
         (
@@ -191,15 +166,14 @@ def log_response_info(response):
                 #  {request.path}")
                 referrer_source = "other"
 
-            redis_client.hincrby(
+            analytics.incr(
                 f"stats:referrer_content:{today}:{content_type}",
                 referrer_source,
-                1,
+                ttl=STATS_TTL,
+            )
+            analytics.incr(
+                f"stats:referrer:{today}", referrer_source, ttl=STATS_TTL
             )
-            redis_client.expire(f"stats:referrer_content:{today}", 2592000 * 3)
-
-            redis_client.hincrby(f"stats:referrer:{today}", referrer_source, 1)
-            redis_client.expire(f"stats:referrer:{today}", 2592000 * 3)
 
         # Track geolocation (only for successful requests and not too frequent)
         client_ip = request.headers.get("X-Real-IP", request.remote_addr)
@@ -208,14 +182,12 @@ def log_response_info(response):
             content_type == "blog"
             and len(request.path.split("/")) == 3
             and response.status_code < 400
-            and not redis_client.exists(f"stats:geo:{client_ip}:{today}")
         ):
-            location = get_location_from_ip(client_ip)
-            if location["country"] != "Unknown":
-                redis_client.hset(
-                    f"stats:geo:{today}", client_ip, json.dumps(location)
-                )
-                redis_client.expire(f"stats:geo:{today}", 2592000 * 3)
+            analytics.push(
+                GEO_QUEUE_KEY,
+                queue_entry(client_ip, today, path_parts[2]),
+                maxlen=GEO_QUEUE_MAX,
+            )
 
     return response
 
@@ -241,6 +213,7 @@ app.register_blueprint(seo_bp)
 init_auth_bp(users, User)
 init_admin_bp(users)
 init_misc_bp(users)
+init_movies_bp()
 
 
 # Root path handled by movies blueprint
@@ -255,11 +228,7 @@ def home():
         stats["music_count"] = MUSIC_COUNT
         stats["memes_count"] = MEMES_COUNT
         stats["blog_count"] = len(
-            [
-                v
-                for v in load_blog_posts().values()
-                if v.get("published", False)
-            ]
+            [v for v in get_blog_posts().values() if v.get("published", False)]
         )
 
         return render_template("index.html", pagetitle="MarinKino", **stats)
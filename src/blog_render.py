@@ -0,0 +1,73 @@
+"""
+Pretvorba vsebine objav bloga iz Markdowna v HTML.
+
+HTML (in iz njega izpeljana povzetek ter čas branja) se izračuna ob
+shranjevanju objave in shrani ob njej skupaj z zgoščeno vrednostjo
+vsebine. Objava se ob ogledu ponovno pretvori le, če se vrednost ne
+ujema (npr. starejše objave); rezultat se nato hrani v pomnilniku.
+"""
+
+import hashlib
+import html
+import math
+import re
+import threading
+
+import markdown
+
+MARKDOWN_EXTENSIONS = ["extra", "codehilite"]
+WORDS_PER_MINUTE = 200
+SUMMARY_LENGTH = 200
+RENDERED_CACHE_SIZE = 256
+
+_rendered = {}
+_rendered_lock = threading.Lock()
+
+
+def content_hash(content):
+    return hashlib.blake2b(
+        (content or "").encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def plain_text(content_html):
+    text = re.sub(r"<[^>]+>", " ", content_html)
+    return " ".join(html.unescape(text).split())
+
+
+def summary(text):
+    if len(text) <= SUMMARY_LENGTH:
+        return text
+    return text[:SUMMARY_LENGTH].rsplit(" ", 1)[0] + " …"
+
+
+def rendered_fields(content):
+    """Polja, ki se shranijo ob objavi: HTML, povzetek in čas branja."""
+    content_html = markdown.markdown(
+        content or "", extensions=MARKDOWN_EXTENSIONS
+    )
+    text = plain_text(content_html)
+    return {
+        "content_hash": content_hash(content),
+        "content_html": content_html,
+        "summary": summary(text),
+        "reading_minutes": max(
+            1, math.ceil(len(text.split()) / WORDS_PER_MINUTE)
+        ),
+    }
+
+
+def rendered_post(post):
+    """Objava s pretvorjeno vsebino; shranjene objave se ne spremenijo."""
+    digest = content_hash(post.get("content"))
+    if post.get("content_hash") == digest and "content_html" in post:
+        return post
+    with _rendered_lock:
+        fields = _rendered.get(digest)
+    if fields is None:
+        fields = rendered_fields(post.get("content"))
+        with _rendered_lock:
+            if len(_rendered) >= RENDERED_CACHE_SIZE:
+                _rendered.clear()
+            _rendered[digest] = fields
+    return dict(post, **fields)
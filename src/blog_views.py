@@ -0,0 +1,188 @@
+"""
+Štetje ogledov objav bloga s HyperLogLog.
+
+Vsak ogled doda IP naslov v dnevni HyperLogLog objave
+(`blog:uv:{objava}:{dan}`, oz. `blog:uvsi:...` za obiskovalce iz
+Slovenije). Ko se ocena dnevnih obiskovalcev poveča, se povečata še
+skupni števec objave (`blog:count:total`), števec dneva
+(`blog:count:daily`) in dnevni števec objave (`blog:count:daily:{objava}`),
+da se ob brisanju objave njeni ogledi odštejejo od dnevnih. Nadzorna plošča
+skupne in dnevne števce prebere v enem krogu.
+
+Dnevni HyperLogLogi zastarijo po STATS_TTL; povzemanje statistike jih prej
+s PFMERGE združi v HyperLogLog vseh bralcev objave (`blog:uv:{objava}`).
+Objave, ogledane posamezen dan, so v množici `blog:uvposts:{dan}`, zato
+povzemanje ne pregleduje vseh ključev.
+"""
+
+import argparse
+import json
+import logging
+from datetime import date, timedelta
+
+from utils import STATS_TTL, redis_client
+
+log = logging.getLogger(__name__)
+
+TOTAL_KEY = "blog:count:total"
+TOTAL_SI_KEY = "blog:count:total_si"
+DAILY_KEY = "blog:count:daily"
+DAILY_SI_KEY = "blog:count:daily_si"
+
+
+def day_key(post_id, day, si=False):
+    return f"blog:{'uvsi' if si else 'uv'}:{post_id}:{day}"
+
+
+def readers_key(post_id):
+    return f"blog:uv:{post_id}"
+
+
+def post_daily_key(post_id, si=False):
+    return f"{DAILY_SI_KEY if si else DAILY_KEY}:{post_id}"
+
+
+def day_posts_key(day):
+    return f"blog:uvposts:{day}"
+
+
+# KEYS[1] = dnevni HyperLogLog, KEYS[2] = skupni števci,
+# KEYS[3] = dnevni števci, KEYS[4] = dnevni števci objave,
+# KEYS[5] = objave dneva; ARGV = IP, objava, dan, TTL
+_RECORD_VIEW_LUA = """
+if redis.call("PFADD", KEYS[1], ARGV[1]) == 1 then
+    redis.call("HINCRBY", KEYS[2], ARGV[2], 1)
+    redis.call("HINCRBY", KEYS[3], ARGV[3], 1)
+    redis.call("HINCRBY", KEYS[4], ARGV[3], 1)
+end
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+redis.call("SADD", KEYS[5], ARGV[2])
+redis.call("EXPIRE", KEYS[5], ARGV[4])
+return 1
+"""
+_record_view = redis_client.register_script(_RECORD_VIEW_LUA)
+
+
+def record_view(post_id, client_ip, day, si=False):
+    """Zabeleži ogled objave; en krog do Redisa."""
+    _record_view(
+        keys=[
+            day_key(post_id, day, si),
+            TOTAL_SI_KEY if si else TOTAL_KEY,
+            DAILY_SI_KEY if si else DAILY_KEY,
+            post_daily_key(post_id, si),
+            day_posts_key(day),
+        ],
+        args=[client_ip, post_id, day, STATS_TTL],
+    )
+
+
+def view_totals():
+    """(ogledi, ogledi iz SI, dnevni ogledi, dnevni ogledi iz SI)."""
+    pipe = redis_client.pipeline(transaction=False)
+    for key in (TOTAL_KEY, TOTAL_SI_KEY, DAILY_KEY, DAILY_SI_KEY):
+        pipe.hgetall(key)
+    return tuple(
+        {k: int(v) for k, v in values.items()} for values in pipe.execute()
+    )
+
+
+def unique_readers(post_ids, today=None):
+    """Ocena vseh različnih bralcev posamezne objave (PFCOUNT)."""
+    today = today or date.today()
+    recent = [today, today - timedelta(days=1)]
+    pipe = redis_client.pipeline(transaction=False)
+    for post_id in post_ids:
+        pipe.pfcount(
+            readers_key(post_id),
+            *[day_key(post_id, d.isoformat()) for d in recent],
+        )
+    return dict(zip(post_ids, pipe.execute()))
+
+
+def merge_readers(dates):
+    """Dnevne HyperLogLoge podanih dni združi v HyperLogLog objave."""
+    dates = sorted(set(dates))
+    pipe = redis_client.pipeline(transaction=False)
+    for day in dates:
+        pipe.smembers(day_posts_key(day))
+    merges = {}
+    for day, post_ids in zip(dates, pipe.execute()):
+        for post_id in post_ids:
+            merges.setdefault(post_id, []).append(day_key(post_id, day))
+    pipe = redis_client.pipeline(transaction=False)
+    for post_id, keys in merges.items():
+        # Cilj je naveden tudi kot vir, da se obstoječi bralci ohranijo
+        pipe.pfmerge(readers_key(post_id), readers_key(post_id), *keys)
+    pipe.execute()
+
+
+def delete_views(post_id):
+    """Izbriše oglede objave in jih odšteje od dnevnih števcev."""
+    keys = [
+        readers_key(post_id),
+        post_daily_key(post_id),
+        post_daily_key(post_id, si=True),
+    ]
+    for pattern in (f"blog:uv:{post_id}:*", f"blog:uvsi:{post_id}:*"):
+        keys += list(redis_client.scan_iter(pattern, count=1000))
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(post_daily_key(post_id))
+    pipe.hgetall(post_daily_key(post_id, si=True))
+    daily, daily_si = pipe.execute()
+    pipe = redis_client.pipeline(transaction=False)
+    for day, count in daily.items():
+        pipe.hincrby(DAILY_KEY, day, -int(count))
+        pipe.srem(day_posts_key(day), post_id)
+    for day, count in daily_si.items():
+        pipe.hincrby(DAILY_SI_KEY, day, -int(count))
+    pipe.delete(*keys)
+    pipe.hdel(TOTAL_KEY, post_id)
+    pipe.hdel(TOTAL_SI_KEY, post_id)
+    pipe.execute()
+
+
+def migrate_blog_views(dry_run=False):
+    """Prepiše stare zgoščene tabele blog:views:{objava}:{dan} z IP
+    naslovi v HyperLogLoge in skupne števce."""
+    migrated = 0
+    days = set()
+    for key in redis_client.scan_iter("blog:views:*:*", count=500):
+        if redis_client.type(key) != "hash":
+            continue
+        post_id, day = key.split(":", 2)[2].rsplit(":", 1)
+        ips = list(redis_client.hkeys(key))
+        locations = redis_client.hmget(f"stats:geo:{day}", ips) if ips else []
+        migrated += 1
+        if dry_run:
+            continue
+        for ip, location in zip(ips, locations):
+            record_view(post_id, ip, day)
+            try:
+                si = location and json.loads(location).get("country") == "SI"
+            except ValueError:
+                si = False
+            if si:
+                record_view(post_id, ip, day, si=True)
+        days.add(day)
+        redis_client.delete(key)
+    merge_readers(days)
+    log.info(
+        f"✅ Pretvorjenih {migrated} dnevnih zapisov ogledov bloga"
+        + (" (brez zapisovanja)" if dry_run else "")
+    )
+    return migrated
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(
+        description="Pretvorba ogledov bloga MarinKino v HyperLogLog"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="samo preštej zapise, ki bi jih pretvoril",
+    )
+    args = parser.parse_args()
+    migrate_blog_views(dry_run=args.dry_run)
@@ -4,10 +4,10 @@ Blueprint modules for MarinKino application
 
 from .admin_bp import admin_bp, init_admin_bp
 from .auth_bp import auth_bp, init_auth_bp
-from .blog_bp import blog_bp, load_blog_posts
+from .blog_bp import blog_bp
 from .memes_bp import MEMES_COUNT, memes_bp
 from .misc_bp import init_misc_bp, misc_bp
-from .movies_bp import get_movies_statistics, movies_bp
+from .movies_bp import get_movies_statistics, init_movies_bp, movies_bp
 from .music_bp import MUSIC_COUNT, music_bp
 from .seo_bp import seo_bp
 
@@ -23,8 +23,8 @@ __all__ = [
     "init_auth_bp",
     "init_admin_bp",
     "init_misc_bp",
+    "init_movies_bp",
     "get_movies_statistics",
     "MUSIC_COUNT",
     "MEMES_COUNT",
-    "load_blog_posts",
 ]
@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 from datetime import datetime, timezone
@@ -19,11 +18,22 @@ from flask_login import current_user, login_required
 from PIL import Image
 from werkzeug.utils import secure_filename
 
+from blog_render import rendered_fields
+from blog_views import delete_views, unique_readers, view_totals
+from log_buffer import recent_log
 from movies_preparation.config import LOG_FILENAME
+from stats_rollup import (
+    StatsRollupWorker,
+    load_day_rollups,
+    load_month_rollups,
+    load_watch_stats,
+)
 from utils import (
+    get_blog_posts,
     is_current_admin_view,
+    load_blog_posts,
     load_blog_subscribers,
-    redis_client,
+    save_blog_posts,
     send_mail,
 )
 
@@ -32,10 +42,8 @@ log = logging.getLogger(__name__)
 admin_bp = Blueprint("admin", __name__)
 
 users = {}
+stats_rollup_worker = None
 
-BLOG_DATA_FILE = os.path.join(
-    os.path.dirname(__file__), "..", "..", "data", "blog_posts.json"
-)
 BLOG_IMAGES_DIR = os.path.join(
     os.path.dirname(__file__), "..", "..", "data", "blog_images"
 )
@@ -87,21 +95,13 @@ def save_blog_image(file, crop_data=None):
 
 def init_admin_bp(_users):
     """Initialize blueprint with app context"""
-    global users
+    global users, stats_rollup_worker
     users = _users
-
-
-def load_blog_posts():
-    if os.path.exists(BLOG_DATA_FILE):
-        with open(BLOG_DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
-
-
-def save_blog_posts(posts):
-    os.makedirs(os.path.dirname(BLOG_DATA_FILE), exist_ok=True)
-    with open(BLOG_DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(posts, f, ensure_ascii=False, indent=2)
+    if stats_rollup_worker is None:
+        stats_rollup_worker = StatsRollupWorker(
+            interval=int(os.getenv("STATS_ROLLUP_SECONDS", "300"))
+        )
+        stats_rollup_worker.start()
 
 
 @admin_bp.route("/admin")
@@ -110,73 +110,30 @@ def admin_panel():
     if not is_current_admin_view(current_user):
         return redirect(url_for("home"))
 
+    day_rollups = load_day_rollups()
+    month_rollups = load_month_rollups()
+
     access_stats_users = {}
     access_stats_routes = {}
 
     user_counter = {}
 
-    for key in redis_client.scan_iter("stats:daily:*"):
-        parts = key.split(":")
-        if len(parts) < 5:
-            continue
-
-        log_date = parts[2]
-        user_id = parts[3]
-        status = parts[4][0] + "xx"
-
-        routes_data = redis_client.hgetall(key)
-
-        access_stats_routes.setdefault(log_date, {})
-        access_stats_users.setdefault(status, {})
-        access_stats_users[status].setdefault(log_date, {})
-        access_stats_users[status][log_date].setdefault(user_id, {})
-
-        for route_method, count in routes_data.items():
-            access_stats_users[status][log_date][user_id].setdefault(
-                "routes", {}
-            )
-            access_stats_users[status][log_date][user_id]["routes"].setdefault(
-                route_method, 0
-            )
-            access_stats_users[status][log_date][user_id]["routes"][
-                route_method
-            ] += int(count)
-            access_stats_users[status][log_date][user_id].setdefault(
-                "count", 0
-            )
-            access_stats_users[status][log_date][user_id]["count"] += int(
-                count
-            )
-            if status.startswith("2") or status.startswith("3"):
-                user_counter.setdefault(user_id, 0)
-                user_counter[user_id] += int(count)
-                route = "/" + "/".join(route_method.split("/")[1:2])
-                access_stats_routes[log_date].setdefault(route, 0)
-                access_stats_routes[log_date][route] += int(count)
+    for log_date, day in day_rollups.items():
+        for user_id, count in day["user_totals"].items():
+            user_counter[user_id] = user_counter.get(user_id, 0) + count
+        if day["routes"]:
+            access_stats_routes[log_date] = day["routes"]
+        for status, day_users in day["users"].items():
+            access_stats_users.setdefault(status, {})[log_date] = day_users
 
     if access_stats_users:
         for k1, v1 in access_stats_users.items():
-            for k2, v2 in v1.items():
-                for k3, v3 in v2.items():
-                    access_stats_users[k1][k2][k3]["routes"] = "\n".join(
-                        [
-                            v[1]
-                            for v in sorted(
-                                [
-                                    (int(count), f"{count}x {route_method}")
-                                    for route_method, count in v3[
-                                        "routes"
-                                    ].items()
-                                ],
-                                reverse=True,
-                            )[:10]
-                        ]
-                    )
+            for k2 in v1:
                 access_stats_users[k1][k2] = {
                     k: v
                     for k, v in sorted(
                         list(access_stats_users[k1][k2].items()),
-                        key=lambda x: -user_counter[x[0]],
+                        key=lambda x: -user_counter.get(x[0], 0),
                     )
                     if v
                 }
@@ -203,17 +160,7 @@ def admin_panel():
         )
         access_stats_routes = access_stats_routes.to_dict()
 
-    access_stats_monthly = {}
-
-    for key in redis_client.scan_iter("stats:monthly:*"):
-        month_label = key.split(":")[-1]
-        monthly_data = redis_client.hgetall(key)
-        access_stats_monthly[month_label] = {}
-        for route_method, count in monthly_data.items():
-            route = "/" + "/".join(route_method.split("/")[1:3])
-            access_stats_monthly[month_label][route] = access_stats_monthly[
-                month_label
-            ].get(route, 0) + int(count)
+    access_stats_monthly = month_rollups
 
     if access_stats_monthly:
         df_monthly = pd.DataFrame(access_stats_monthly).T.fillna(0).astype(int)
@@ -231,61 +178,8 @@ def admin_panel():
         access_stats_monthly_dict = {}
         monthly_columns = []
 
-    users_stats = {}
-    user_prog_keys = redis_client.keys("prog:*")
-
-    for key in user_prog_keys:
-        user_id = key.split(":")[1]
-        user_data_raw = redis_client.hgetall(key)
-
-        total_watch_time = 0
-        watch_ratios = []
-        watched_count = 0
-        starting_count = 0
-        last_start_time = "-"
-
-        for video_file, progress_json in user_data_raw.items():
-            progress = json.loads(progress_json)
-
-            watch_time = progress.get("total_play_time", 0)
-            duration = progress.get("duration", 0)
-            current_max_start = progress.get("last_start_time")
-
-            if watch_time and duration:
-                ratio = (watch_time / duration) * 100
-                if ratio < 5:
-                    continue
-                watch_ratios.append(ratio)
-                starting_count += 1
-                if ratio >= 70:
-                    watched_count += 1
-
-                if current_max_start:
-                    if (
-                        last_start_time == "-"
-                        or current_max_start > last_start_time
-                    ):
-                        last_start_time = current_max_start
-
-                total_watch_time += watch_time
-
-        def seconds_to_str(seconds):
-            hours = int(seconds // 3600)
-            minutes = int((seconds % 3600) // 60)
-            return f"{hours}h {minutes:02}m"
-
-        percent = (
-            round(sum(watch_ratios) / len(watch_ratios), 1)
-            if watch_ratios
-            else 0
-        )
-        users_stats[user_id] = {
-            "Skupen čas": seconds_to_str(total_watch_time),
-            "Število začetih": starting_count,
-            "Število ogledanih": watched_count,
-            "Povprečen delež ogleda": f"{percent} %",
-            "Zadnji začetek ogleda": last_start_time,
-        }
+    watch_stats = load_watch_stats()
+    users_stats = watch_stats["users"]
 
     if users_stats:
         df_users = pd.DataFrame(users_stats).T.sort_values(
@@ -297,204 +191,55 @@ def admin_panel():
         users_stats_dict = {}
         users_stats_columns = []
 
-    if os.path.exists(LOG_FILENAME):
-        with open(
-            LOG_FILENAME,
-            "r",
-            encoding="utf-8",
-        ) as f:
-            lines = [line.split(" - ") for line in f.read().split("\n")]
-            new_lines = []
-            last_line = lines[0]
-            for line in lines[1:]:
-                if "waitress.queue: Task queue depth is" in " - ".join(line):
-                    try:
-                        if int(line[-1].split(" ")[-1]) < 10:
-                            continue
-                    except Exception:
-                        pass
-                if (
-                    len(last_line) < 4
-                    or len(line) < 4
-                    or line[3] != last_line[3]
-                    or line[2] != last_line[2]
-                ):
-                    new_lines.append(" - ".join(last_line))
-                    last_line = line
-                else:
-                    last_line[0] = (
-                        last_line[0].split(" <-> ")[0] + " <-> " + line[0]
-                    )
-                    last_line[1] = (
-                        str(int(last_line[1].replace("x", "")) + int(line[1]))
-                        + "x"
-                    )
-            new_lines.append(" - ".join(last_line))
-
-            system_log = "\n".join(new_lines[-100:])
-        with open(
-            LOG_FILENAME,
-            "w",
-            encoding="utf-8",
-        ) as f:
-            f.write("\n".join(new_lines))
-    else:
-        system_log = "Missing log file!"
-
-    # Calculate top 20 movies by total watch ratio
-    movies_watch_stats = {}
-
-    for key in user_prog_keys:
-        # Decode key if it's bytes
-        if isinstance(key, bytes):
-            key = key.decode("utf-8")
-
-        user_id = key.split(":")[1]
-        user_data_raw = redis_client.hgetall(key)
-
-        for video_file, progress_json in user_data_raw.items():
-            # Decode if bytes
-            if isinstance(video_file, bytes):
-                video_file = video_file.decode("utf-8")
-            if isinstance(progress_json, bytes):
-                progress_json = progress_json.decode("utf-8")
-
-            progress = json.loads(progress_json)
-            watch_time = progress.get("total_play_time", 0)
-            duration = progress.get("duration", 0)
-
-            if watch_time and duration:
-                ratio = (watch_time / duration) * 100
-                if ratio < 5:
-                    continue
-
-                # Extract movie folder path from video file path
-                # video_file is like: "path/to/movie/video.mp4"
-                # We need to extract the folder part
-                # (everything except the filename)
-                parts = video_file.split(os.sep)
-                if len(parts) >= 2:
-                    # Remove the last part (video filename) to get
-                    # the movie folder
-                    movie_folder = os.sep.join(parts[:-1])
-
-                    if movie_folder not in movies_watch_stats:
-                        movies_watch_stats[movie_folder] = {
-                            "total_ratio": 0,
-                            "count": 0,
-                            "users": set(),
-                            "total_duration": 0,
-                        }
+    system_log = recent_log(LOG_FILENAME, limit=100)
 
-                    movies_watch_stats[movie_folder]["total_ratio"] += ratio
-                    movies_watch_stats[movie_folder]["count"] += 1
-                    movies_watch_stats[movie_folder]["users"].add(user_id)
-                    movies_watch_stats[movie_folder]["total_duration"] += (
-                        duration
-                    )
-
-    # Calculate averages and sort
-    top_movies = []
-    for movie_folder, stats in movies_watch_stats.items():
-        avg_ratio = (
-            stats["total_ratio"] / stats["count"] if stats["count"] > 0 else 0
-        )
-        total_watch_hours = stats["total_duration"] / 3600
-
-        top_movies.append(
-            {
-                "folder": movie_folder,
-                "total_ratio": round(stats["total_ratio"], 1),
-                "avg_ratio": round(avg_ratio, 1),
-                "watch_count": stats["count"],
-                "unique_users": len(stats["users"]),
-                "total_watch_hours": round(total_watch_hours, 1),
-            }
-        )
-
-    # Sort by total_ratio (highest first) and get top 20
-    top_movies_sorted = sorted(
-        top_movies, key=lambda x: x["total_ratio"], reverse=True
-    )[:20]
+    # Top 20 movies by total watch ratio
+    top_movies_sorted = watch_stats["top_movies"]
 
     # Referrer statistics
     referrer_stats = {}
-    for key in redis_client.scan_iter("stats:referrer:*"):
-        date_part = key.split(":")[-1]
-        referrer_data = redis_client.hgetall(key)
-        for source, count in referrer_data.items():
-            referrer_stats.setdefault(source, {})
-            referrer_stats[source][date_part] = int(count)
-
-    # Geolocation statistics
     geo_stats = {}
     geo_stats_cities = {}
-    all_geo_data = {}
-    for key in redis_client.scan_iter("stats:geo:*"):
-        date_part = key.split(":")[-1]
-        geo_data = redis_client.hgetall(key)
-
-        for ip, location_json in geo_data.items():
-            try:
-                location = json.loads(location_json)
-                if ip not in all_geo_data.keys():
-                    all_geo_data[ip] = location
-                country = location.get("country", "Unknown")
-                city = location.get("city", "Unknown")
-                city_key = f"{city} ({country})"
-                city = city_key if country == "SI" else country
-                geolocation = location.get("geolocation", "").split(",")
-
-                geo_stats.setdefault(city, 0)
-                geo_stats[city] += 1
-                geo_stats_cities.setdefault(city_key, {"count": 0})
-                geo_stats_cities[city_key]["count"] += 1
-                if len(geolocation) == 2:
-                    geo_stats_cities[city_key]["geolocation"] = (
-                        float(geolocation[0]),
-                        float(geolocation[1]),
-                    )
-            except Exception:
-                continue
+    for date_part, day in sorted(day_rollups.items()):
+        for source, count in day["referrers"].items():
+            referrer_stats.setdefault(source, {})[date_part] = count
+
+        # Geolocation statistics
+        for city, count in day["geo"].items():
+            geo_stats[city] = geo_stats.get(city, 0) + count
+        for city_key, city in day["geo_cities"].items():
+            geo_stats_cities.setdefault(city_key, {"count": 0})
+            geo_stats_cities[city_key]["count"] += city["count"]
+            if "geolocation" in city:
+                geo_stats_cities[city_key]["geolocation"] = tuple(
+                    city["geolocation"]
+                )
     geo_stats = dict(sorted(geo_stats.items(), key=lambda x: -x[1]))
 
     # Blog statistics
-    blog_views_daily = {}
-    blog_si_views_daily = {}
-    total_views = 0
-    total_si_views = 0
-    blog_posts = load_blog_posts()
-    blog_stats = []
-    for post_id, post in blog_posts.items():
-        views = 0
-        si_views = 0
-        for key in redis_client.scan_iter(f"blog:views:{post_id}:*"):
-            part_views = 0
-            part_si_views = 0
-            date_part = key.split(":")[-1]
-            for ip in redis_client.hgetall(key).keys():
-                part_views += 1
-                if all_geo_data.get(ip, {}).get("country") == "SI":
-                    part_si_views += 1
-            views += part_views
-            si_views += part_si_views
-            blog_views_daily[date_part] = (
-                blog_views_daily.get(date_part, 0) + part_views
-            )
-            blog_si_views_daily[date_part] = (
-                blog_si_views_daily.get(date_part, 0) + part_si_views
-            )
-        total_views += views
-        total_si_views += si_views
-        blog_stats.append(
-            {
-                "id": post_id,
-                "title": post["title"],
-                "views": views,
-                "si_views": si_views,
-                "created_at": post["created_at"][:16],
-            }
-        )
+    (
+        blog_views,
+        blog_si_views,
+        blog_views_daily,
+        blog_si_views_daily,
+    ) = view_totals()
+    blog_posts = get_blog_posts()
+    readers = unique_readers(list(blog_posts))
+    blog_stats = [
+        {
+            "id": post_id,
+            "title": post["title"],
+            "views": blog_views.get(post_id, 0),
+            "si_views": blog_si_views.get(post_id, 0),
+            "readers": readers[post_id],
+            "created_at": post["created_at"][:16],
+        }
+        for post_id, post in blog_posts.items()
+    ]
+    total_views = sum(stat["views"] for stat in blog_stats)
+    total_si_views = sum(stat["si_views"] for stat in blog_stats)
+    blog_views_daily = dict(sorted(blog_views_daily.items()))
+    blog_si_views_daily = dict(sorted(blog_si_views_daily.items()))
 
     return render_template(
         "admin.html",
@@ -563,11 +308,9 @@ def admin_blog():
     )
 
     # Get view stats for each post and format dates
+    blog_views = view_totals()[0]
     for post in sorted_posts:
-        views = 0
-        for key in redis_client.scan_iter(f"blog:views:{post['id']}:*"):
-            views += len(redis_client.hgetall(key).keys())
-        post["views"] = views
+        post["views"] = blog_views.get(post["id"], 0)
         # Format dates
         if post.get("created_at"):
             try:
@@ -704,7 +447,9 @@ def admin_blog_new():
             "published": published,
             "created_at": now,
             "published_at": now if published else None,
+            "updated_at": now,
             "mail_date": None,
+            **rendered_fields(content),
         }
         save_blog_posts(posts)
 
@@ -839,7 +584,9 @@ def admin_blog_edit(post_id):
                 "created_at", datetime.now(timezone.utc).isoformat()
             ),
             "published_at": published_at,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
             "mail_date": existing_mail_date,
+            **rendered_fields(content),
         }
         save_blog_posts(posts)
 
@@ -888,7 +635,7 @@ def admin_blog_delete(post_id):
         del posts[post_id]
         save_blog_posts(posts)
         # Delete view stats
-        redis_client.delete(f"blog:views:{post_id}")
+        delete_views(post_id)
         flash("Blog objava izbrisana.", "success")
     return redirect(url_for("admin.admin_blog"))
 
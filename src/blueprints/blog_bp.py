@@ -1,27 +1,34 @@
-import json
+import hashlib
 import logging
 import os
+import threading
 from datetime import datetime, timezone
 from urllib.parse import quote
 
-import markdown
 from flask import (
     Blueprint,
     abort,
     flash,
+    jsonify,
     make_response,
     redirect,
     render_template,
     request,
     send_from_directory,
+    session,
     url_for,
 )
 from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
 
+from blog_render import rendered_post
+from blog_views import record_view
 from utils import (
     FLASK_ENV,
+    blog_post_store,
+    get_blog_posts,
     load_blog_subscribers,
-    redis_client,
+    post_modified,
     safe_path,
     save_blog_subscribers,
     send_mail,
@@ -32,23 +39,6 @@ log = logging.getLogger(__name__)
 
 blog_bp = Blueprint("blog", __name__)
 
-BLOG_DATA_FILE = os.path.join(
-    os.path.dirname(__file__), "..", "..", "data", "blog_posts.json"
-)
-
-
-def load_blog_posts():
-    if os.path.exists(BLOG_DATA_FILE):
-        with open(BLOG_DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
-
-
-def save_blog_posts(posts):
-    os.makedirs(os.path.dirname(BLOG_DATA_FILE), exist_ok=True)
-    with open(BLOG_DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(posts, f, ensure_ascii=False, indent=2)
-
 
 def blog_timestamp(blog):
     timestamp = (
@@ -60,26 +50,95 @@ def blog_timestamp(blog):
         return datetime.now(timezone.utc)
 
 
+# Strani bloga za anonimne obiskovalce se upodobijo enkrat na različico
+# objav (blog_post_store.version se poveča ob vsakem shranjevanju ali
+# brisanju). Shranjena stran je enaka za vse obiskovalce: žetona CSRF
+# nima, csrf.js ga ob oddaji obrazca prenese z /blog/csrf-token.
+PAGE_CACHE_SIZE = 256
+_page_cache = {}
+_page_cache_version = None
+_page_cache_lock = threading.Lock()
+
+
+def page_cacheable():
+    return (
+        not current_user.is_authenticated
+        and not request.query_string
+        and not session.get("_flashes")
+    )
+
+
+def cached_page(render):
+    """Vrne (html, etag) upodobljene strani za trenutno pot."""
+    global _page_cache_version
+    version = blog_post_store.version
+    with _page_cache_lock:
+        if version != _page_cache_version:
+            _page_cache.clear()
+            _page_cache_version = version
+        page = _page_cache.get(request.path)
+    if page is None:
+        html = render(csrf_token=lambda: "", csrf_deferred=True)
+        page = (html, hashlib.blake2b(html.encode("utf-8")).hexdigest()[:32])
+        with _page_cache_lock:
+            if _page_cache_version == version:
+                if len(_page_cache) >= PAGE_CACHE_SIZE:
+                    _page_cache.clear()
+                _page_cache[request.path] = page
+    return page
+
+
+def blog_page_response(render, modified):
+    """Odgovor z ETag in Last-Modified; za anonimne iz predpomnilnika."""
+    if not page_cacheable():
+        return render()
+    html, etag = cached_page(render)
+    response = make_response(html)
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    response.headers["Cache-Control"] = "public, no-cache"
+    return response.make_conditional(request)
+
+
+@blog_bp.route("/blog/csrf-token")
+def blog_csrf_token():
+    """Žeton CSRF za obrazce na straneh iz predpomnilnika."""
+    response = jsonify(csrf_token=generate_csrf())
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @blog_bp.route("/blog")
 def blog_list():
-    posts = load_blog_posts()
+    posts = get_blog_posts()
     # Filter published posts for non-admin users
     if not (current_user.is_authenticated and current_user.is_admin):
         posts = {k: v for k, v in posts.items() if v.get("published", False)}
     # Sort by date descending
     sorted_posts = sorted(posts.values(), key=blog_timestamp, reverse=True)
 
-    # Format dates
-    for post in sorted_posts:
-        post["created_at_display"] = blog_timestamp(post).strftime(
-            "%d. %m. %Y"
+    # Format dates (on copies; the shared posts stay unchanged)
+    sorted_posts = [
+        dict(
+            post,
+            created_at_display=blog_timestamp(post).strftime("%d. %m. %Y"),
         )
+        for post in sorted_posts
+    ]
 
-    return render_template(
-        "blog_list.html",
-        posts=sorted_posts,
-        pagetitle="Sončnice",
-        blog_view="blog",
+    def render(**context):
+        return render_template(
+            "blog_list.html",
+            posts=sorted_posts,
+            pagetitle="Sončnice",
+            blog_view="blog",
+            **context,
+        )
+
+    return blog_page_response(
+        render,
+        max(filter(None, map(post_modified, sorted_posts)), default=None),
     )
 
 
@@ -123,8 +182,7 @@ def blog_subscribe():
 
 @blog_bp.route("/blog/<post_id>")
 def blog_post(post_id):
-    posts = load_blog_posts()
-    post = posts.get(post_id)
+    post = get_blog_posts().get(post_id)
     if not post:
         abort(404)
 
@@ -132,10 +190,8 @@ def blog_post(post_id):
     if not current_user.is_authenticated and not post.get("published", False):
         abort(404)
 
-    # Render Markdown content
-    post["content_html"] = markdown.markdown(
-        post.get("content", ""), extensions=["extra", "codehilite"]
-    )
+    # Markdown je pretvorjen že ob shranjevanju objave
+    post = dict(rendered_post(post))
 
     # Format dates
     post["created_at_display"] = blog_timestamp(post).strftime("%d. %m. %Y")
@@ -148,26 +204,31 @@ def blog_post(post_id):
         client_ip = request.headers.get("X-Real-IP", request.remote_addr)
         # Increment view count
         today = datetime.now(timezone.utc).date().isoformat()
-        redis_client.hincrby(f"blog:views:{post_id}:{today}", client_ip, 1)
+        record_view(post_id, client_ip, today)
 
+    # Stran je v predpomnilniku shranjena po poti, zato naslovi ne smejo
+    # biti odvisni od domene zahteve
+    domain = os.getenv("WWW_DOMAIN")
     og_image = None
     if post.get("image"):
-        og_image = post["image"]
-        domain = os.getenv("WWW_DOMAIN")
-        og_image = f"https://{domain}/blog/image/{og_image}"
-
-    return render_template(
-        "blog_post.html",
-        post=post,
-        pagetitle=post.get("title", "Sončnice"),
-        blog_view="blog",
-        og_image=og_image,
-        og_url=request.url,
-        og_title=post.get("title"),
-        og_description=post.get("seo_description")
-        or post.get("excerpt")
-        or post.get("subtitle"),
-    )
+        og_image = f"https://{domain}/blog/image/{post['image']}"
+
+    def render(**context):
+        return render_template(
+            "blog_post.html",
+            post=post,
+            pagetitle=post.get("title", "Sončnice"),
+            blog_view="blog",
+            og_image=og_image,
+            og_url=f"https://{domain}{request.path}",
+            og_title=post.get("title"),
+            og_description=post.get("seo_description")
+            or post.get("excerpt")
+            or post.get("subtitle"),
+            **context,
+        )
+
+    return blog_page_response(render, post_modified(post))
 
 
 @blog_bp.route("/blog/image/<file_name>")
@@ -1,7 +1,9 @@
+import hashlib
 import logging
 import os
 import random
-from datetime import date
+import threading
+from datetime import date, datetime, time, timedelta
 from urllib.parse import quote
 
 from flask import (
@@ -13,49 +15,109 @@ from flask import (
 )
 from flask_login import current_user, login_required
 
-from utils import FLASK_ENV, is_current_admin_view, safe_path
+from utils import FLASK_ENV, is_current_admin_view, redis_client, safe_path
 
 log = logging.getLogger(__name__)
 
 memes_bp = Blueprint("memes", __name__)
 
-# Global variables
-meme_id = 0
-user_meme_count = {}
 user_meme_limit = 33
 
+# Kazalec vrstenja in dnevni števci so v Redisu, zato se vsi procesi
+# strežnika vrtijo skozi isti vrstni red in štejejo iste omejitve.
+MEMES_SEED_KEY = "memes:seed"
+MEMES_CURSOR_KEY = "memes:cursor"
+
 # Initialize memes
 memes = os.listdir("data/memes")
-memes = [
+memes = sorted(
     slika
     for slika in memes
     if slika.lower().endswith(
         (".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp4")
     )
-]
-random.shuffle(memes)
+)
 MEMES_COUNT = len(memes)
+_memes_seed = None
+_memes_seed_lock = threading.Lock()
+
+# KEYS[1] = dnevni števec uporabnika, KEYS[2] = kazalec vrstenja;
+# ARGV = omejitev, čas izteka števca (polnoč)
+_NEXT_MEME_LUA = """
+local count = redis.call("INCR", KEYS[1])
+if count == 1 then
+    redis.call("EXPIREAT", KEYS[1], ARGV[2])
+end
+if count > tonumber(ARGV[1]) then
+    return {count, -1}
+end
+return {count, redis.call("INCR", KEYS[2])}
+"""
+_next_meme = redis_client.register_script(_NEXT_MEME_LUA)
+
+
+def shuffled_memes():
+    """Šale v premešanem vrstnem redu, ki ga določa skupno seme v Redisu.
+
+    Mesto šale je odvisno le od semena in imena datoteke, zato je vrstni
+    red enak v vseh procesih, dodane ali izbrisane šale pa ga ne premešajo.
+    Vrne kopijo, ki je drugi zahtevki ne spreminjajo.
+    """
+    global _memes_seed
+    with _memes_seed_lock:
+        if _memes_seed is None:
+            redis_client.set(MEMES_SEED_KEY, random.getrandbits(32), nx=True)
+            _memes_seed = redis_client.get(MEMES_SEED_KEY)
+            memes[:] = sorted(
+                memes,
+                key=lambda name: hashlib.blake2b(
+                    f"{_memes_seed}:{name}".encode("utf-8"), digest_size=8
+                ).digest(),
+            )
+        return memes[:]
+
+
+def forget_meme(name):
+    """Odstrani izbrisano šalo iz skupnega seznama."""
+    with _memes_seed_lock:
+        if name in memes:
+            memes.remove(name)
+
+
+def next_meme_position(user_id):
+    """Poveča dnevni števec uporabnika in vrne naslednje mesto v vrstnem
+    redu ali None, če je uporabnik dosegel dnevno omejitev."""
+    today = date.today()
+    midnight = datetime.combine(today + timedelta(days=1), time.min)
+    _, cursor = _next_meme(
+        keys=[f"memes:count:{today.isoformat()}:{user_id}", MEMES_CURSOR_KEY],
+        args=[user_meme_limit, int(midnight.timestamp())],
+    )
+    return None if cursor < 0 else cursor - 1
 
 
 @memes_bp.route("/memes")
 @login_required
 def meme():
-    global meme_id
-    global user_meme_count
-    user_meme_count[current_user.id] = user_meme_count.get(current_user.id, {})
-    if user_meme_count[current_user.id].get("last_date") != str(date.today()):
-        user_meme_count[current_user.id]["last_date"] = str(date.today())
-        user_meme_count[current_user.id]["count"] = 0
-    user_meme_count[current_user.id]["count"] += 1
-    if user_meme_count[current_user.id]["count"] > user_meme_limit:
+    position = next_meme_position(current_user.id)
+    if position is None:
         return render_template(
             "limit_exceeded.html",
             section="šal",
             pagetitle="Dovolj za danes v MarinKino",
         )
 
-    izbrana = memes[meme_id]
-    meme_id = (meme_id + 1) % len(memes)
+    order = shuffled_memes()
+    while order:
+        izbrana = order[position % len(order)]
+        if os.path.exists(os.path.join("data/memes", izbrana)):
+            break
+        # Šalo je morda izbrisal drug proces; preskoči jo
+        forget_meme(izbrana)
+        order.remove(izbrana)
+        position = redis_client.incr(MEMES_CURSOR_KEY) - 1
+    else:
+        abort(404)
     return render_template(
         "memes.html",
         pagetitle="MarinKino - Šale in navdihi",
@@ -129,4 +191,5 @@ def meme_remove(meme_file_name):
     if not os.path.exists(path):
         return "", 404
     os.remove(path)
+    forget_meme(meme_file_name)
     return "", 204
@@ -1,39 +1,56 @@
-import difflib
-import io
+import hashlib
 import json
 import logging
 import os
 import random
 import re
 import shutil
-import zipfile
+import sys
+import threading
+import unicodedata
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone
+from types import MappingProxyType
 from urllib.parse import quote, unquote
 
 from flask import (
     Blueprint,
+    Response,
     abort,
     flash,
     make_response,
     redirect,
     render_template,
     request,
-    send_file,
     send_from_directory,
     session,
     url_for,
 )
 from flask_login import current_user, login_required
 
-from movies_preparation import FILMS_ROOT, check_folder
+from movies_preparation import FILMS_ROOT
+from movies_preparation.catalog import (
+    CatalogWatcher,
+    find_changed_films,
+    load_films,
+    read_film,
+    write_catalog,
+)
+from movies_preparation.search_index import SearchIndex
 from utils import (
     FLASK_ENV,
+    get_progress,
     is_current_admin_view,
+    progress_field,
+    record_progress_start,
+    record_progress_ticks,
     redis_client,
     safe_path,
     send_mail,
+    set_progress_position,
     users,
 )
+from zip_stream import StoredZip
 
 log = logging.getLogger(__name__)
 
@@ -67,92 +84,495 @@ for g in GENRES_MAPPING.values():
         known_genres.append(g)
 
 MOVIES_PER_PAGE = 40
+MAX_DOWNLOAD_SIZE = int(os.getenv("MAX_DOWNLOAD_GB", "16")) * 1024**3
 
-# Initialize films
-all_films = {
-    m.folder.replace(FILMS_ROOT, ""): {
-        "cover": m.cover.replace(FILMS_ROOT, ""),
-        "thumbnail": m.thumbnail.replace(FILMS_ROOT, ""),
-        "title": m.title,
-        "original_title": m.original_title,
-        "year": f" ({m.year})" if m.year else "",
-        "folder": m.folder.replace(FILMS_ROOT, ""),
-        "group_folder": m.folder.replace(FILMS_ROOT, "").split(os.sep)[1],
-        "description": m.plot,
-        "players": m.players.replace(";", ","),
-        "runtimes": m.runtimes,
-        "runtimes_by_files": m.runtimes_by_files,
-        "slosinh": " Sinhronizirano" if m.slosinh else "",
-        "genres": [
-            GENRES_MAPPING.get(
-                g,
-                g.replace("č", "c")
-                .replace("š", "s")
-                .replace("ž", "z")
-                .replace(" ", ""),
-            )
-            for g in m.genres
-        ],
-        "video_files": m.video_files,
-        "subtitles": m.subtitles,
-        "subtitle_buttons": [
-            subtitle.replace(".vtt", "")
-            .lower()
-            .replace("subs", "")
-            .replace("subtitles-", "")
-            .replace("_", "")
-            .replace("si", "slo")
-            .title()
-            .replace("-Auto", " - Avtomatski prevod")
-            for subtitle in m.subtitles
-        ],
-        "movie_id": f"mov_{i}",
-        "recommendation_level": m.recommendation_level,
-        "user_notes": m.user_notes,
-        "is_chosen_series": m.is_chosen_series,
-        "ratings": m.ratings,
+
+def fold_genre(genre):
+    return GENRES_MAPPING.get(
+        genre,
+        genre.replace("č", "c")
+        .replace("š", "s")
+        .replace("ž", "z")
+        .replace(" ", ""),
+    )
+
+
+def subtitle_button(subtitle):
+    return (
+        subtitle.replace(".vtt", "")
+        .lower()
+        .replace("subs", "")
+        .replace("subtitles-", "")
+        .replace("_", "")
+        .replace("si", "slo")
+        .title()
+        .replace("-Auto", " - Avtomatski prevod")
+    )
+
+
+def _compute_ratings_summary(ratings):
+    # ratings may be lists of raw values or dicts like {"user": id, "value": v}
+    def extract(vals):
+        out = []
+        for v in vals or []:
+            if isinstance(v, dict):
+                out.append(v.get("value"))
+            else:
+                out.append(v)
+        return out
+
+    def summary(key):
+        vals = [x for x in extract(ratings.get(key, [])) if x is not None]
+        try:
+            nums = [float(x) for x in vals]
+        except Exception:
+            nums = []
+        if not nums:
+            return {"count": 0, "avg": None}
+        return {
+            "count": len(nums),
+            "avg": round(sum(nums) / len(nums), 1 if "age" not in key else 0),
+        }
+
+    return {
+        "would_watch_again": summary("would_watch_again"),
+        "violence": summary("violence"),
+        "sexual": summary("sexual"),
+        "age_group": summary("age_group"),
+        "video_quality": summary("video_quality"),
+        "subtitles_quality": summary("subtitles_quality"),
     }
-    for i, m in enumerate(check_folder(FILMS_ROOT))
-}
 
-groups = [f["group_folder"] for f in all_films.values()]
-group_folders = {
-    g: g[3:].replace("-", " ").replace("series", "(Serija)").title().strip()
-    + f" ({groups.count(g)})"
-    for g in sorted(list(set(groups)))
-}
+
+def _plain(value):
+    """Pretvori nespremenljive vsebnike nazaj v navaden JSON."""
+    if isinstance(value, tuple):
+        return [_plain(v) for v in value]
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+def _frozen(value):
+    """Gnezdene sezname in slovarje zapre v nespremenljive oblike."""
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: _frozen(v) for k, v in value.items()})
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class FilmRecord:
+    """Nespremenljiv zapis filma, ki si ga delijo vse zahteve.
+
+    Podatki o ogledih posameznega uporabnika niso del zapisa, ampak jih
+    vsaka zahteva izračuna posebej (`WatchState`). Kratki ponavljajoči se
+    nizi (žanri, skupine, priporočila) so internirani.
+    """
+
+    cover: str
+    thumbnail: str
+    title: str
+    original_title: str
+    year: str
+    folder: str
+    group_folder: str
+    description: str
+    players: str
+    runtimes: str
+    runtimes_by_files: MappingProxyType
+    slosinh: str
+    genres: tuple
+    video_files: tuple
+    subtitles: tuple
+    subtitle_buttons: tuple
+    movie_id: str
+    recommendation_level: str
+    user_notes: MappingProxyType
+    is_chosen_series: bool
+    ratings: MappingProxyType
+    ratings_summary: MappingProxyType
+
+    def to_dict(self):
+        return {
+            field.name: _plain(getattr(self, field.name))
+            for field in fields(self)
+        }
+
+
+def film_entry(m, movie_id):
+    """Pripravi podatke filma iz kataloga za prikaz na strani."""
+    folder = m["folder"].replace(FILMS_ROOT, "")
+    return FilmRecord(
+        cover=m["cover"].replace(FILMS_ROOT, ""),
+        thumbnail=m["thumbnail"].replace(FILMS_ROOT, ""),
+        title=m["title"],
+        original_title=m["original_title"],
+        year=sys.intern(f" ({m['year']})" if m["year"] else ""),
+        folder=folder,
+        group_folder=sys.intern(folder.split(os.sep)[1]),
+        description=m["plot"],
+        players=m["players"].replace(";", ","),
+        runtimes=m["runtimes"],
+        runtimes_by_files=_frozen(m["runtimes_by_files"]),
+        slosinh=sys.intern(" Sinhronizirano" if m["slosinh"] else ""),
+        genres=tuple(sys.intern(fold_genre(g)) for g in m["genres"]),
+        video_files=tuple(m["video_files"]),
+        subtitles=tuple(m["subtitles"]),
+        subtitle_buttons=tuple(
+            sys.intern(subtitle_button(s)) for s in m["subtitles"]
+        ),
+        movie_id=movie_id,
+        recommendation_level=sys.intern(m["recommendation_level"] or ""),
+        user_notes=_frozen(m["user_notes"] or {}),
+        is_chosen_series=m["is_chosen_series"],
+        ratings=_frozen(m["ratings"] or {}),
+        ratings_summary=_frozen(_compute_ratings_summary(m["ratings"] or {})),
+    )
+
+
+class WatchState:
+    """Stanje ogledov filma za enega uporabnika v okviru ene zahteve."""
+
+    __slots__ = ("watch_info", "watch_ratio", "last_play_time")
+
+    def __init__(self, watch_info, watch_ratio, last_play_time):
+        self.watch_info = watch_info
+        self.watch_ratio = watch_ratio
+        self.last_play_time = last_play_time
+
+
+def group_folder_label(group_folder, count):
+    return (
+        group_folder[3:]
+        .replace("-", " ")
+        .replace("series", "(Serija)")
+        .title()
+        .strip()
+        + f" ({count})"
+    )
+
+
+# Lastnosti filma, iz katerih so zgrajeni indeksi kataloga
+INDEXED_FIELDS = (
+    "title",
+    "original_title",
+    "group_folder",
+    "genres",
+    "recommendation_level",
+    "runtimes",
+)
+
+
+def film_key(folder):
+    return folder.replace(FILMS_ROOT, "")
+
+
+def str_to_int(s):
+    s = str(s)
+    if len(s) == 0:
+        return 0
+    s = [int(i) for i in str(s.split(" ")[-1]).split("-")]
+    return sum(s) / len(s)
+
+
+def runtime_minutes(film):
+    try:
+        return str_to_int(film.runtimes)
+    except ValueError:
+        return 0
+
+
+def facet_postings(films, keys_of):
+    """Za vsako vrednost lastnosti vrne množico položajev filmov."""
+    postings = {}
+    for position, film in enumerate(films):
+        for key in keys_of(film):
+            postings.setdefault(key, set()).add(position)
+    return {key: frozenset(p) for key, p in postings.items()}
+
+
+class MoviesCatalog:
+    """Pogled na katalog filmov za strežnik.
+
+    Ob dodajanju, brisanju ali spremembi filma, ki vpliva na indekse, se
+    zgradi nov objekt, ki v celoti zamenja globalni `movies_catalog`.
+    Zahteva si na začetku shrani referenco nanj in tako nikoli ne vidi
+    napol posodobljenega kataloga. Ocene, komentarji in opombe ne vplivajo
+    na indekse, zato se ob njih na mestu zamenja le zapis filma.
+    """
+
+    __slots__ = (
+        "entries",
+        "films",
+        "movie_index",
+        "group_counts",
+        "group_folders",
+        "next_movie_id",
+        "search_index",
+        "order",
+        "positions",
+        "by_group",
+        "by_genre",
+        "recommended",
+        "by_title",
+        "by_runtime",
+    )
+
+    def __init__(self, entries, films, movie_index, group_counts, next_id):
+        self.entries = entries
+        self.films = films
+        self.movie_index = movie_index
+        self.group_counts = group_counts
+        self.group_folders = {
+            g: group_folder_label(g, group_counts[g])
+            for g in sorted(group_counts)
+        }
+        self.next_movie_id = next_id
+        self.search_index = SearchIndex(
+            (film, (film.title, film.original_title))
+            for film in films.values()
+        )
+
+        # Indeksi za filtriranje in urejanje, izračunani enkrat na verzijo
+        self.order = list(films.values())
+        self.positions = {key: i for i, key in enumerate(films)}
+        self.by_group = facet_postings(self.order, lambda f: (f.group_folder,))
+        self.by_genre = facet_postings(self.order, lambda f: f.genres)
+        self.recommended = frozenset(
+            i for i, film in enumerate(self.order) if film.recommendation_level
+        )
+        positions = range(len(self.order))
+        self.by_title = tuple(
+            sorted(positions, key=lambda i: self.order[i].title)
+        )
+        self.by_runtime = tuple(
+            sorted(positions, key=lambda i: runtime_minutes(self.order[i]))
+        )
+
+    def select(self, movietype="", genre="", only_recommended=False, sort=""):
+        """Vrne filme, ki ustrezajo filtrom, urejene po `sort`.
+
+        Brez `sort` ostane vrstni red kataloga.
+        """
+        selected = None
+        if movietype:
+            selected = self.by_group.get(movietype, frozenset())
+        if genre:
+            postings = self.by_genre.get(genre, frozenset())
+            selected = postings if selected is None else selected & postings
+        if only_recommended:
+            selected = (
+                self.recommended
+                if selected is None
+                else selected & self.recommended
+            )
+
+        if not sort:
+            positions = range(len(self.order))
+        elif "runtime" in sort:
+            positions = self.by_runtime
+        else:
+            positions = self.by_title
+        if "desc" in sort:
+            positions = reversed(positions)
+
+        if selected is None:
+            return [self.order[i] for i in positions]
+        if not sort:
+            positions = sorted(selected)
+        return [self.order[i] for i in positions if i in selected]
+
+    @classmethod
+    def from_entries(cls, entries):
+        films = {
+            film_key(m["folder"]): film_entry(m, f"mov_{i}")
+            for i, m in enumerate(entries)
+        }
+        group_counts = {}
+        for film in films.values():
+            g = film.group_folder
+            group_counts[g] = group_counts.get(g, 0) + 1
+        return cls(
+            {film_key(m["folder"]): m for m in entries},
+            films,
+            {m.movie_id: m for m in films.values()},
+            group_counts,
+            len(entries),
+        )
+
+    def updated(self, changed_entries, removed_folders):
+        """Vrne nov katalog, v katerem so zamenjani le podani filmi."""
+        entries = dict(self.entries)
+        films = dict(self.films)
+        movie_index = dict(self.movie_index)
+        group_counts = dict(self.group_counts)
+        next_id = self.next_movie_id
+
+        def drop(key):
+            old = films.pop(key, None)
+            entries.pop(key, None)
+            if old is not None:
+                movie_index.pop(old.movie_id, None)
+                group_counts[old.group_folder] -= 1
+                if not group_counts[old.group_folder]:
+                    del group_counts[old.group_folder]
+            return old
+
+        for folder in removed_folders:
+            drop(film_key(folder))
+
+        for entry in changed_entries:
+            key = film_key(entry["folder"])
+            old = drop(key)
+            if old is not None:
+                movie_id = old.movie_id
+            else:
+                movie_id = f"mov_{next_id}"
+                next_id += 1
+            film = film_entry(entry, movie_id)
+            entries[key] = entry
+            films[key] = film
+            movie_index[movie_id] = film
+            g = film.group_folder
+            group_counts[g] = group_counts.get(g, 0) + 1
+
+        return MoviesCatalog(
+            entries, films, movie_index, group_counts, next_id
+        )
+
+    def replace_films(self, changed_entries):
+        """Na mestu zamenja zapise obstoječih filmov, če se ne spremeni
+        nič, kar je v indeksih. Vrne False (in ne spremeni ničesar), če je
+        treba zgraditi nov katalog."""
+        replacements = []
+        for entry in changed_entries:
+            key = film_key(entry["folder"])
+            old = self.films.get(key)
+            if old is None:
+                return False
+            film = film_entry(entry, old.movie_id)
+            if any(
+                getattr(film, name) != getattr(old, name)
+                for name in INDEXED_FIELDS
+            ):
+                return False
+            replacements.append((key, entry, film))
+        for key, entry, film in replacements:
+            position = self.positions[key]
+            self.entries[key] = entry
+            self.films[key] = film
+            self.movie_index[film.movie_id] = film
+            self.order[position] = film
+            self.search_index.replace(position, film)
+        return True
+
+
+# Initialize films
+movies_catalog = MoviesCatalog.from_entries(load_films(FILMS_ROOT))
 recommendation_levels = ["", "recommend", "warm-recommend"]
 
-global_movie_index = {}
-for m in all_films.values():
-    global_movie_index[m["movie_id"]] = m
+CATALOG_REFRESH_SECONDS = int(os.getenv("MOVIES_CATALOG_REFRESH", "60"))
+_catalog_update_lock = threading.Lock()
+_catalog_dirty = False
+_catalog_watcher = None
+
+
+def reload_films(film_folders=(), removed_folders=()):
+    """Ponovno prebere le podane filme in jih posodobi v katalogu.
+
+    Posnetek kataloga na disku zapiše nit v ozadju ob naslednjem
+    preverjanju (oz. takoj, če niti ni), ne zahteva.
+    """
+    global movies_catalog, _catalog_dirty
+    with _catalog_update_lock:
+        changed = []
+        for folder in film_folders:
+            try:
+                changed.append(read_film(folder))
+            except Exception as e:
+                log.error(f"Napaka pri branju filma {folder}: {e}")
+        if removed_folders or not movies_catalog.replace_films(changed):
+            movies_catalog = movies_catalog.updated(changed, removed_folders)
+        _catalog_dirty = True
+    if _catalog_watcher is None:
+        write_catalog_snapshot()
+    return movies_catalog
+
+
+def write_catalog_snapshot():
+    """Zapiše posnetek kataloga, če se je od zadnjega zapisa spremenil."""
+    global _catalog_dirty
+    with _catalog_update_lock:
+        if not _catalog_dirty:
+            return
+        entries = list(movies_catalog.entries.values())
+        _catalog_dirty = False
+    try:
+        write_catalog(entries)
+    except OSError as e:
+        log.error(f"Napaka pri zapisovanju kataloga: {e}")
+        with _catalog_update_lock:
+            _catalog_dirty = True
 
 
-def get_user_progress_data(user_id):
-    data = redis_client.hgetall(f"prog:{user_id}")
-    return {k: json.loads(v) for k, v in data.items()}
+def check_catalog_changes():
+    """Poišče spremenjene mape filmov in osveži samo te."""
+    changed, removed = find_changed_films(movies_catalog.entries.values())
+    if changed or removed:
+        log.info(
+            f"Osvežujem katalog: {len(changed)} spremenjenih,"
+            f" {len(removed)} odstranjenih filmov"
+        )
+        reload_films(changed, removed)
+    write_catalog_snapshot()
+
 
+def init_movies_bp(refresh_interval=CATALOG_REFRESH_SECONDS):
+    """Zažene nit, ki v ozadju osvežuje katalog filmov"""
+    global _catalog_watcher
+    if _catalog_watcher is None and refresh_interval > 0:
+        _catalog_watcher = CatalogWatcher(
+            check_catalog_changes, refresh_interval
+        )
+        _catalog_watcher.start()
 
-def add_watch_info(movie, user_data):
-    movie["watch_info"] = {}
+
+def film_progress_fields(movie):
+    """Polja v prog:{user} za vse video datoteke filma."""
+    return {
+        video_file: progress_field(f"{movie.folder}/{video_file}")
+        for video_file in movie.video_files
+    }
+
+
+def get_films_progress(user_id, films):
+    """Napredek uporabnika samo za datoteke podanih filmov."""
+    return get_progress(
+        user_id,
+        [f for film in films for f in film_progress_fields(film).values()],
+    )
+
+
+def file_runtime_seconds(movie, video_file):
+    runtime_key = (
+        video_file.replace(".mp4", "").replace("_Slo", "").replace("_Eng", "")
+    )
+    return float(movie.runtimes_by_files[runtime_key]) * 60
+
+
+def watch_state(movie, user_data):
+    """Izračuna stanje ogledov filma, ne da bi spreminjal skupni zapis."""
+    watch_info = {}
     total_play_time = 0
     total_duration = 0
-    for video_file in movie["video_files"]:
-        file_path = os.path.join(movie["folder"][1:], video_file).replace(
-            ".mp4", ""
-        )
-        watch_inf = user_data.get(file_path, {})
+    last_play_time = 0
+    for video_file, field in film_progress_fields(movie).items():
+        watch_inf = user_data.get(field, {})
         last_play_time = watch_inf.get("last_play_time", 0)
-        duration = watch_inf.get(
-            "duration",
-            float(
-                movie["runtimes_by_files"][
-                    video_file.replace(".mp4", "")
-                    .replace("_Slo", "")
-                    .replace("_Eng", "")
-                ]
-            )
-            * 60,
+        duration = watch_inf.get("duration") or file_runtime_seconds(
+            movie, video_file
         )
         watch_ratio = round(last_play_time / duration * 100)
         if watch_ratio > 95 or abs(duration - last_play_time) < 30:
@@ -160,26 +580,21 @@ def add_watch_info(movie, user_data):
             last_play_time = 0
         total_play_time += watch_ratio * duration / 100
         total_duration += duration
-        movie["watch_info"][video_file] = {
+        watch_info[video_file] = {
             "last_play_time": last_play_time,
             "watch_ratio": watch_ratio,
         }
-        movie["last_play_time"] = last_play_time
-    movie["watch_ratio"] = int(total_play_time / total_duration * 100)
-    return movie
+    return WatchState(
+        watch_info,
+        int(total_play_time / total_duration * 100),
+        last_play_time,
+    )
 
 
 # Helper functions
-def str_to_int(s):
-    s = str(s)
-    if len(s) == 0:
-        return 0
-    s = [int(i) for i in str(s.split(" ")[-1]).split("-")]
-    return sum(s) / len(s)
-
-
-def fuzzy_match(query, title):
-    return difflib.SequenceMatcher(None, query, title.lower()).ratio()
+def refresh_catalog_entry(movie_folder):
+    """Po spremembi readme.json ponovno prebere film v katalog."""
+    return reload_films([os.path.join(FILMS_ROOT, movie_folder[1:])])
 
 
 def get_movies_statistics():
@@ -191,11 +606,10 @@ def get_movies_statistics():
         "cartoons_duration": 0.0,
     }
 
-    for film in all_films.values():
+    for film in movies_catalog.films.values():
         try:
-            runtimes_by_files = film.get("runtimes_by_files", {})
-            runtime = sum(float(r) for r in runtimes_by_files.values())
-            if "01-zbirke-risank" in film["group_folder"].lower():
+            runtime = sum(float(r) for r in film.runtimes_by_files.values())
+            if "01-zbirke-risank" in film.group_folder.lower():
                 stats["cartoons_count"] += 1
                 stats["cartoons_duration"] += runtime / 60
             else:
@@ -210,6 +624,7 @@ def get_movies_statistics():
 # Main routes
 @movies_bp.route("/movies")
 def index():
+    catalog = movies_catalog
     if (
         current_user.is_authenticated
         and session.get("view_as", None) != "anonymous"
@@ -239,93 +654,35 @@ def index():
         new_settings["movietype"] = movietype
         new_settings["onlyunwatched"] = onlyunwatched
         new_settings["onlyrecommended"] = onlyrecommended
-        redis_client.hset(user_key, "movies", json.dumps(new_settings))
-
-        search_query = request.args.get("q", "").strip().lower()
-
-        user_data = get_user_progress_data(current_user.id)
-        movies = [
-            m
-            for m in all_films.values()
-            if (m["group_folder"] == movietype)
-            or (movietype == "")
-            or search_query
-        ]
-
-        if search_query:
-            scored = []
-
-            for m in movies:
-                title = m["title"].lower()
-                original_title = m["original_title"].lower()
-                score = max(
-                    fuzzy_match(search_query, title),
-                    (
-                        fuzzy_match(search_query, original_title)
-                        if original_title
-                        else 0
-                    ),
-                )
-
-                if search_query in title or search_query in original_title:
-                    score += 0.3
 
-                if score > 0.4:
-                    m["_score"] = score
-                    scored.append(m)
-
-            movies = sorted(scored, key=lambda x: x["_score"], reverse=True)
-        else:
-            if genre_filter:
-                movies = [
-                    m for m in movies if genre_filter in m.get("genres", [])
-                ]
-            if onlyrecommended == "on":
-                movies = [m for m in movies if m["recommendation_level"]]
-
-            if sort:
-                movies = sorted(
-                    movies,
-                    key=lambda m: (
-                        str_to_int(m["runtimes"])
-                        if "runtime" in sort
-                        else m["title"]
-                    ),
-                    reverse="desc" in sort,
-                )
-            else:
-                random.shuffle(movies)
-
-        movies = [add_watch_info(m, user_data) for m in movies]
-        if not search_query and onlyunwatched == "on":
-            movies = [m for m in movies if m["watch_ratio"] < 100]
-
-        movie_ids = [m["movie_id"] for m in movies]
-        cache_key = f"cache:movies:{current_user.id}"
-        redis_client.delete(cache_key)
-        if movie_ids:
-            redis_client.rpush(cache_key, *movie_ids)
-            redis_client.expire(cache_key, 3600)
+        # Vrstni red filmov se ob nalaganju strani ponovno izračuna iz
+        # filtrov in semena za naključni vrstni red
+        listing = {
+            **new_settings,
+            "q": request.args.get("q", "").strip().lower(),
+            "seed": random.getrandbits(32),
+        }
+        redis_client.hset(
+            user_key,
+            mapping={
+                "movies": json.dumps(new_settings),
+                "movies_listing": json.dumps(listing),
+            },
+        )
     else:
         if current_user.is_authenticated:
-            cache_key = f"cache:movies:{current_user.id}"
-            redis_client.delete(cache_key)
+            redis_client.hdel(
+                f"user_settings:{current_user.id}", "movies_listing"
+            )
         genre_filter = request.args.get("genre")
         sort = request.args.get("sort")
         onlyunwatched = request.args.get("onlyunwatched")
         onlyrecommended = request.args.get("onlyrecommended")
         movietype = request.args.get("movietype")
-        movies = []
-
-    movies_page = movies[:MOVIES_PER_PAGE]
-    has_more = len(movies) > MOVIES_PER_PAGE
 
     return render_template(
         "movies.html",
         pagetitle="MarinKino",
-        movies=movies_page,
-        has_more=has_more,
-        page=1,
         selected_movietype=movietype,
         selected_genre=genre_filter,
         sort=sort,
@@ -333,7 +690,7 @@ def index():
         onlyrecommended=onlyrecommended == "on",
         group_folders={
             k: v
-            for k, v in group_folders.items()
+            for k, v in catalog.group_folders.items()
             if (
                 is_current_admin_view(current_user)
                 or "neurejen" not in k.lower()
@@ -343,70 +700,118 @@ def index():
     )
 
 
-@movies_bp.route("/movies/page")
-@login_required
-def movies_page():
-    page = int(request.args.get("page", 1))
+def shuffle_key(seed, movie_id):
+    """Naključen, a za isto seme vedno enak položaj filma.
 
-    cache_key = f"cache:movies:{current_user.id}"
-    start = page * MOVIES_PER_PAGE
-    end = start + MOVIES_PER_PAGE - 1
+    Ker je ključ odvisen le od filma, osvežitev kataloga med listanjem ne
+    premeša že prikazanih filmov.
+    """
+    return hashlib.blake2b(
+        f"{seed}:{movie_id}".encode(), digest_size=8
+    ).digest()
 
-    page_ids = redis_client.lrange(cache_key, start, end)
-    movies_page = [
-        global_movie_index[mid]
-        for mid in page_ids
-        if mid in global_movie_index
-    ]
 
-    has_more = end < redis_client.llen(cache_key) - 1
+def listing_movies(catalog, listing):
+    """Vrstni red filmov, kot ga določajo shranjeni filtri in seme."""
+    if listing.get("q"):
+        return [m for _, m in catalog.search_index.search(listing["q"])]
+    sort = listing.get("sort", "")
+    movies = catalog.select(
+        listing.get("movietype", ""),
+        listing.get("genre", ""),
+        listing.get("onlyrecommended") == "on",
+        sort,
+    )
+    if not sort:
+        seed = listing.get("seed", 0)
+        movies.sort(key=lambda m: shuffle_key(seed, m.movie_id))
+    return movies
+
+
+@movies_bp.route("/movies/page")
+@login_required
+def movies_page():
+    listing = redis_client.hget(
+        f"user_settings:{current_user.id}", "movies_listing"
+    )
+    if not listing:
+        return {"movies": [], "has_more": False, "cursor": 0}
+    listing = json.loads(listing)
+
+    # Kazalec je položaj v vrstnem redu pred filtrom nepogledanih, zato se
+    # strani ne zamaknejo, ko uporabnik med listanjem označi film
+    cursor = request.args.get("cursor", type=int)
+    if cursor is None:
+        cursor = request.args.get("page", 0, type=int) * MOVIES_PER_PAGE
+    cursor = max(cursor, 0)
+
+    movies = listing_movies(movies_catalog, listing)
+    only_unwatched = (
+        not listing.get("q") and listing.get("onlyunwatched") == "on"
+    )
+    is_admin = is_current_admin_view(current_user)
+
+    page_movies = []
+    while cursor < len(movies) and len(page_movies) < MOVIES_PER_PAGE:
+        # Napredek beremo le za filme, ki pridejo na vrsto
+        batch = movies[cursor : cursor + MOVIES_PER_PAGE - len(page_movies)]
+        user_data = get_films_progress(current_user.id, batch)
+        for m in batch:
+            cursor += 1
+            watch_ratio = watch_state(m, user_data).watch_ratio
+            if only_unwatched and watch_ratio >= 100:
+                continue
+            page_movies.append(
+                {
+                    **m.to_dict(),
+                    "watch_ratio": watch_ratio,
+                    "is_admin": is_admin,
+                }
+            )
 
     return {
-        "movies": [
-            {**m, "is_admin": is_current_admin_view(current_user)}
-            for m in movies_page
-        ],
-        "has_more": has_more,
+        "movies": page_movies,
+        "has_more": cursor < len(movies),
+        "cursor": cursor,
     }
 
 
 @movies_bp.route("/movies/play/<movies_subfolder>/<movie_folder>")
 @login_required
 def play_movie(movies_subfolder, movie_folder):
-    user_data = get_user_progress_data(current_user.id)
-
-    film_candidate = all_films.get(
+    film_candidate = movies_catalog.films.get(
         os.path.sep + os.path.join("", movies_subfolder, movie_folder)
     )
     if film_candidate is None:
         log.error("There is no film candidates!")
         return "", 404
 
-    film = add_watch_info(film_candidate, user_data)
-    video_files = film["video_files"]
-    subtitles = film["subtitles"]
-    subtitle_buttons = film["subtitle_buttons"]
-    ratings = film["ratings"]
+    film = film_candidate
+    video_files = film.video_files
+    subtitles = film.subtitles
+    subtitle_buttons = film.subtitle_buttons
 
     if len(video_files) > 0:
         slosubs_file = None
         for subs in subtitles:
             if "slo" in subs.lower() or "si" in subs.lower():
                 slosubs_file = subs
-        film["ratings_summary"] = _compute_ratings_summary(ratings)
 
         return render_template(
             "player.html",
-            pagetitle=film["title"] + film["year"],
+            pagetitle=film.title + film.year,
             is_collection=len(video_files) > 1,
             movie=film,
+            watch=watch_state(
+                film, get_films_progress(current_user.id, [film])
+            ),
             known_genres=known_genres,
             group_folder=movies_subfolder,
             folder=movie_folder,
             video_file=sorted(
                 video_files, key=lambda x: x.endswith("_Eng.mp4"), reverse=True
             )[0]
-            if film["is_chosen_series"]
+            if film.is_chosen_series
             else video_files[0],
             video_files=video_files,
             video_file_languages=[
@@ -434,20 +839,16 @@ def play_movie(movies_subfolder, movie_folder):
 @movies_bp.route("/movies/download/<movies_subfolder>/<movie_folder>")
 @login_required
 def download_movie(movies_subfolder, movie_folder):
-    user_data = get_user_progress_data(current_user.id)
-
-    film_candidate = all_films.get(
+    film = movies_catalog.films.get(
         os.path.sep + os.path.join("", movies_subfolder, movie_folder)
     )
-    if film_candidate is None:
+    if film is None:
         log.error("There is no film candidates!")
         return "", 404
-    film = add_watch_info(film_candidate, user_data)
-    video_files = film["video_files"]
-    subtitles = film["subtitles"]
+    video_files = film.video_files
+    subtitles = film.subtitles
 
     if len(video_files) > 0:
-        max_zip_size = 4 * 1024**3  # 4 GB
         total_size = 0
         file_paths = []
 
@@ -457,7 +858,7 @@ def download_movie(movies_subfolder, movie_folder):
             )
             if os.path.exists(p):
                 total_size += os.path.getsize(p)
-                file_paths.append((p, video_file))
+                file_paths.append((video_file, p))
 
         for subtitle in subtitles:
             p = os.path.join(
@@ -465,7 +866,7 @@ def download_movie(movies_subfolder, movie_folder):
             )
             if os.path.exists(p):
                 total_size += os.path.getsize(p)
-                file_paths.append((p, subtitle))
+                file_paths.append((subtitle, p))
 
         # add cover image
         cover_image_path = os.path.join(
@@ -473,55 +874,92 @@ def download_movie(movies_subfolder, movie_folder):
         )
         if os.path.exists(cover_image_path):
             total_size += os.path.getsize(cover_image_path)
-            file_paths.append((cover_image_path, "cover_image.jpg"))
+            file_paths.append(("cover_image.jpg", cover_image_path))
 
-        if total_size > max_zip_size:
+        if total_size > MAX_DOWNLOAD_SIZE:
             log.warning(
                 f"Download blocked: {movie_folder} is too large"
                 f" ({total_size / (1024**3):.2f} GB)"
             )
             flash(
-                "Ta film je prevelik za prenos (nad 4 GB). "
+                "Ta film je prevelik za prenos "
+                f"(nad {MAX_DOWNLOAD_SIZE // 1024**3} GB). "
                 "Prosimo, oglejte si ga neposredno v predvajalniku.",
                 "warning",
             )
             return redirect(request.referrer or "/")
 
-        # 3. PAKIRANJE V RAM (Zgodi se le, če je pod mejo)
-        zip_filename = f"{movie_folder}.zip"
-        memory_file = io.BytesIO()
-
         # add some selected metadata from film object
         metadata = {
             "source": "MarinKino",
-            "title": film["title"],
-            "original_title": film["original_title"],
-            "year": film["year"],
-            "description": film["description"],
-            "genres": film["genres"],
-            "players": film["players"],
-            "runtimes": film["runtimes"],
-            "slosinh": film["slosinh"],
-            "recommendation_level": film["recommendation_level"],
+            "title": film.title,
+            "original_title": film.original_title,
+            "year": film.year,
+            "description": film.description,
+            "genres": list(film.genres),
+            "players": film.players,
+            "runtimes": film.runtimes,
+            "slosinh": film.slosinh,
+            "recommendation_level": film.recommendation_level,
         }
 
-        with zipfile.ZipFile(memory_file, "w", zipfile.ZIP_STORED) as zipf:
-            for full_path, archive_name in file_paths:
-                zipf.write(full_path, archive_name)
-            # add metadata.json
-            zipf.writestr(
-                "metadata.json",
-                json.dumps(metadata, ensure_ascii=False, indent=4),
-            )
-
-        memory_file.seek(0)
+        # Arhiv se pošilja sproti po kosih; velikost je znana vnaprej, zato
+        # lahko prekinjen prenos nadaljuje z glavo Range.
+        archive = StoredZip(
+            file_paths,
+            extra=[
+                (
+                    "metadata.json",
+                    json.dumps(metadata, ensure_ascii=False, indent=4).encode(
+                        "utf-8"
+                    ),
+                )
+            ],
+            mtime=max((os.path.getmtime(p) for _, p in file_paths), default=0),
+        )
+        etag = archive.etag
+
+        start, stop = 0, archive.size
+        status = 200
+        byte_range = request.range
+        if_range = request.if_range
+        if byte_range is not None and (
+            if_range.etag is None or if_range.etag == etag
+        ):
+            span = byte_range.range_for_length(archive.size)
+            if span is None:
+                return Response(
+                    status=416,
+                    headers={"Content-Range": f"bytes */{archive.size}"},
+                )
+            start, stop = span
+            status = 206
 
-        response = send_file(
-            memory_file,
-            as_attachment=True,
-            download_name=zip_filename,
+        response = Response(
+            archive.iter_bytes(start, stop),
+            status=status,
             mimetype="application/zip",
+            direct_passthrough=True,
+        )
+        # Kot send_file: ASCII ime za stare brskalnike in UTF-8 ime
+        zip_filename = f"{movie_folder}.zip"
+        response.headers.set(
+            "Content-Disposition",
+            "attachment",
+            **{
+                "filename": unicodedata.normalize("NFKD", zip_filename)
+                .encode("ascii", "ignore")
+                .decode("ascii"),
+                "filename*": f"UTF-8''{quote(zip_filename, safe='')}",
+            },
         )
+        response.headers["Content-Length"] = str(stop - start)
+        response.headers["Accept-Ranges"] = "bytes"
+        response.headers["ETag"] = f'"{etag}"'
+        if status == 206:
+            response.headers["Content-Range"] = (
+                f"bytes {start}-{stop - 1}/{archive.size}"
+            )
         response.headers["X-Accel-Buffering"] = "no"
         response.headers["X-Accel-Limit-Rate"] = str(
             10 * 1024 * 1024
@@ -532,47 +970,13 @@ def download_movie(movies_subfolder, movie_folder):
         return "", 404
 
 
-def _compute_ratings_summary(ratings):
-    # ratings may be lists of raw values or dicts like {"user": id, "value": v}
-    def extract(vals):
-        out = []
-        for v in vals or []:
-            if isinstance(v, dict):
-                out.append(v.get("value"))
-            else:
-                out.append(v)
-        return out
-
-    def summary(key):
-        vals = [x for x in extract(ratings.get(key, [])) if x is not None]
-        try:
-            nums = [float(x) for x in vals]
-        except Exception:
-            nums = []
-        if not nums:
-            return {"count": 0, "avg": None}
-        return {
-            "count": len(nums),
-            "avg": round(sum(nums) / len(nums), 1 if "age" not in key else 0),
-        }
-
-    return {
-        "would_watch_again": summary("would_watch_again"),
-        "violence": summary("violence"),
-        "sexual": summary("sexual"),
-        "age_group": summary("age_group"),
-        "video_quality": summary("video_quality"),
-        "subtitles_quality": summary("subtitles_quality"),
-    }
-
-
 @movies_bp.route("/movies/rate", methods=["POST"])
 @login_required
 def rate_movie():
     try:
         data = json.loads(request.data)
         movie_folder = data.get("movieFolder")
-        if not movie_folder or movie_folder not in all_films:
+        if not movie_folder or movie_folder not in movies_catalog.films:
             return {"status": "error", "message": "Film ne obstaja"}, 404
 
         violence = int(data.get("violence", 0))
@@ -632,7 +1036,7 @@ def rate_movie():
             json.dump(movie_metadata, f, ensure_ascii=False, indent=4)
 
         # update in-memory
-        all_films[movie_folder]["ratings"] = movie_metadata.get("ratings", {})
+        catalog = refresh_catalog_entry(movie_folder)
 
         summary = _compute_ratings_summary(movie_metadata.get("ratings", {}))
         log.info(
@@ -641,7 +1045,8 @@ def rate_movie():
 
         # Pošlji obvestilo administratorju o novih ocenah
         try:
-            movie_title = all_films[movie_folder].get("title", movie_folder)
+            film = catalog.films.get(movie_folder)
+            movie_title = film.title if film else movie_folder
             admin_email = users.get("admin", {}).get(
                 "emails", [os.getenv("GMAIL_USERNAME")]
             )[0]
@@ -710,16 +1115,15 @@ def rate_movie():
 )
 @login_required
 def remove_movie(movies_subfolder, movie_folder):
-    global all_films
     if not is_current_admin_view(current_user):
         return redirect(url_for("home"))
     removing_folder = os.path.sep + os.path.join(
         "", movies_subfolder, movie_folder
     )
-    if removing_folder not in all_films.keys():
+    if removing_folder not in movies_catalog.films:
         log.error(f"Manjka film za odstranjevanje: {removing_folder}")
         return {"status": "missing", "folder": removing_folder}
-    all_films.pop(removing_folder)
+    reload_films(removed_folders=[FILMS_ROOT + removing_folder])
     removing_folder = os.path.join(FILMS_ROOT, movies_subfolder, movie_folder)
     for filename in os.listdir(removing_folder):
         try:
@@ -744,14 +1148,13 @@ def remove_movie(movies_subfolder, movie_folder):
 @movies_bp.route("/movies/recommend", methods=["POST"])
 @login_required
 def remcommend_movie():
-    global all_films
     if not is_current_admin_view(current_user):
         return redirect(url_for("home"))
     data = json.loads(request.data)
 
     recommendation_level = data["recommendation_level"]
     recommending_folder = data["movieFolder"]
-    if recommending_folder not in all_films.keys():
+    if recommending_folder not in movies_catalog.films:
         log.error(f"Manjka film za predlog: {recommending_folder}")
         return {"status": "missing", "folder": recommending_folder}
 
@@ -762,9 +1165,6 @@ def remcommend_movie():
             "recommendation_level": recommendation_level,
         }
 
-    all_films[recommending_folder]["recommendation_level"] = (
-        recommendation_level
-    )
     recommending_metadata_file = os.path.join(
         FILMS_ROOT, recommending_folder[1:], "readme.json"
     )
@@ -773,6 +1173,7 @@ def remcommend_movie():
     movie_metadata["recommendation_level"] = recommendation_level
     with open(recommending_metadata_file, "w", encoding="utf-8") as f:
         json.dump(movie_metadata, f, ensure_ascii=False, indent=4)
+    refresh_catalog_entry(recommending_folder)
     log.info(
         f"Filmu {recommending_folder} nastavljen nivo priporočila:"
         f" '{recommendation_level}'"
@@ -850,27 +1251,11 @@ def movie_file(filename):
                 start = int(match.group(1))
                 if start == 0:
                     try:
-                        aux_filename = "/".join(
-                            filename.replace(".mp4", "")
-                            .replace("_Slo", "")
-                            .replace("_Eng", "")
-                            .split("/")[:3]
-                        )
-                        user_key = f"prog:{current_user.id}"
-                        data = redis_client.hget(user_key, aux_filename)
-                        data = json.loads(data) if data else {}
-                        data["last_start_time"] = datetime.now().isoformat()[
-                            :16
-                        ]
-                        data["count_start_time"] = (
-                            data.get("count_start_time", 0) + 1
+                        record_progress_start(
+                            current_user.id, progress_field(filename)
                         )
-                        redis_client.hset(
-                            user_key, aux_filename, json.dumps(data)
-                        )
-                    except Exception as e:
-                        print(f"Redis error: {e}")
-                        pass
+                    except Exception:
+                        log.exception("❌ Napaka pri beleženju začetka ogleda")
 
     # Slikice (platnice)
     elif "cover_thumb.jpg" in filename:
@@ -886,41 +1271,50 @@ def movie_file(filename):
     return response
 
 
-@movies_bp.route("/movies/video-progress", methods=["POST"])
-@login_required
-def video_progress():
-    data = json.loads(request.data)
-    filename = "/".join(
-        unquote(data["filename"])
-        .split("/movies/file/")[-1]
-        .replace(".mp4", "")
-        .replace("_Slo", "")
-        .replace("_Eng", "")
-        .split("/")[:3]
+MAX_PROGRESS_TICKS = 50
+
+
+def progress_tick(data):
+    """Pretvori tik predvajanja iz brskalnika v (polje, čas, trajanje)."""
+    filename = progress_field(
+        unquote(data["filename"]).split("/movies/file/")[-1]
     )
     if filename == "unknown":
-        return "", 404
-
+        return None
     current_time = round(data["currentTime"] - 0.49)
     duration = round(data["duration"], 1)
+    return filename, current_time, duration
 
-    user_key = f"prog:{current_user.id}"
 
-    user_data = redis_client.hget(user_key, filename)
-    user_data = json.loads(user_data) if user_data else {}
+@movies_bp.route("/movies/video-progress", methods=["POST"])
+@login_required
+def video_progress():
+    tick = progress_tick(json.loads(request.data))
+    if tick is None:
+        return "", 404
 
-    last_play_time = user_data.get("last_play_time", 0)
-    total_play_time = user_data.get("total_play_time", 0)
+    record_progress_ticks(current_user.id, [tick])
 
-    from_last = current_time - last_play_time
-    if 0 < from_last < 60:
-        total_play_time += from_last
+    return "", 204
 
-    user_data["duration"] = duration
-    user_data["last_play_time"] = current_time
-    user_data["total_play_time"] = total_play_time
 
-    redis_client.hset(user_key, filename, json.dumps(user_data))
+@movies_bp.route("/movies/video-progress/batch", methods=["POST"])
+@login_required
+def video_progress_batch():
+    """Več tikov naenkrat; sendBeacon jih pošlje v polju obrazca `ticks`."""
+    try:
+        if "ticks" in request.form:
+            ticks = json.loads(request.form["ticks"])
+        else:
+            ticks = json.loads(request.data).get("ticks", [])
+        ticks = [progress_tick(t) for t in ticks[:MAX_PROGRESS_TICKS]]
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        log.warning(f"Neveljavni tiki napredka: {e}")
+        return "", 400
+
+    ticks = [t for t in ticks if t is not None]
+    if ticks:
+        record_progress_ticks(current_user.id, ticks)
 
     return "", 204
 
@@ -929,37 +1323,21 @@ def video_progress():
 @login_required
 def video_progress_change():
     data = json.loads(request.data)
-    selected_movie = None
-    for f in all_films.values():
-        if f["movie_id"] == data["movieId"]:
-            selected_movie = f
-            break
+    selected_movie = movies_catalog.movie_index.get(data["movieId"])
     if selected_movie is None:
         return "", 204
 
-    user_key = f"prog:{current_user.id}"
-
-    for video_file in selected_movie["video_files"]:
-        filename = "/".join(
-            os.path.join(selected_movie["folder"][1:], video_file)
-            .replace(".mp4", "")
-            .replace("_Slo", "")
-            .replace("_Eng", "")
-            .split("/")[:3]
-        )
-        user_data = redis_client.hget(user_key, filename)
-        user_data = json.loads(user_data) if user_data else {}
-
-        if "duration" not in user_data.keys():
-            duration = selected_movie["runtimes_by_files"][video_file] * 60
-            user_data["duration"] = duration
-        else:
-            duration = user_data["duration"]
-
-        user_data["last_play_time"] = (
-            0 if int(data["izbor"]) == 0 else duration
-        )
-        redis_client.hset(user_key, filename, json.dumps(user_data))
+    durations = {}
+    for video_file, filename in film_progress_fields(selected_movie).items():
+        try:
+            durations[filename] = file_runtime_seconds(
+                selected_movie, video_file
+            )
+        except (KeyError, TypeError, ValueError):
+            durations[filename] = 0
+    set_progress_position(
+        current_user.id, durations, at_end=int(data["izbor"]) != 0
+    )
 
     return "", 204
 
@@ -978,7 +1356,8 @@ def add_comment():
 
         # Validacija
         if not movie_folder or (
-            movie_folder not in all_films and movie_folder != "Splošno"
+            movie_folder not in movies_catalog.films
+            and movie_folder != "Splošno"
         ):
             log.error(f"Neveljaven film za komentar: {movie_folder}")
             return {"status": "error", "message": "Film ne obstaja"}, 404
@@ -1035,10 +1414,8 @@ def add_comment():
 
         # Posodobi in-memory podatke
         if not is_splosno:
-            all_films[movie_folder]["user_notes"] = movie_metadata[
-                "user_notes"
-            ]
-            movie_title = all_films[movie_folder]["title"]
+            catalog = refresh_catalog_entry(movie_folder)
+            movie_title = catalog.films[movie_folder].title
         else:
             movie_title = "Splošno"
 
@@ -1103,7 +1480,8 @@ def admin_comment():
 
         # Validacija
         if not movie_folder or (
-            movie_folder not in all_films.keys() and movie_folder != "Splošno"
+            movie_folder not in movies_catalog.films
+            and movie_folder != "Splošno"
         ):
             log.error(f"Neveljaven film: {movie_folder}")
             return {"status": "error", "message": "Film ne obstaja"}, 404
@@ -1146,10 +1524,8 @@ def admin_comment():
 
         # Posodobi in-memory podatke
         if not is_splosno:
-            all_films[movie_folder]["user_notes"] = movie_metadata[
-                "user_notes"
-            ]
-            movie_title = all_films[movie_folder]["title"]
+            catalog = refresh_catalog_entry(movie_folder)
+            movie_title = catalog.films[movie_folder].title
         else:
             movie_title = "Splošno"
 
@@ -1237,8 +1613,8 @@ def get_comments():
                             }
                         )
 
-        for movie_folder, movie_data in all_films.items():
-            user_notes = movie_data.get("user_notes", [])
+        for movie_folder, movie_data in movies_catalog.films.items():
+            user_notes = movie_data.user_notes
 
             for comment_index, note in user_notes.items():
                 # Pokaži samo uporabniške komentarje (ne admin opozoril)
@@ -1252,7 +1628,7 @@ def get_comments():
                             "text": note.get("text"),
                             "date": note.get("date")[:16],
                             "movie_folder": movie_folder,
-                            "movie_title": movie_data.get("title"),
+                            "movie_title": movie_data.title,
                             "comment_index": comment_index,
                         }
                     )
@@ -1279,7 +1655,7 @@ def add_warning():
         icon = ALERT_TYPES.get(warning_type)
 
         # Validacija
-        if not movie_folder or movie_folder not in all_films:
+        if not movie_folder or movie_folder not in movies_catalog.films:
             log.error(f"Neveljaven film za opozorilo: {movie_folder}")
             return {"status": "error", "message": "Film ne obstaja"}, 404
 
@@ -1326,7 +1702,7 @@ def add_warning():
             json.dump(movie_metadata, f, ensure_ascii=False, indent=4)
 
         # Posodobi in-memory podatke
-        all_films[movie_folder]["user_notes"] = movie_metadata["user_notes"]
+        refresh_catalog_entry(movie_folder)
 
         log.info(
             f"Admin opozorilo '{warning_type}' dodano na film"
@@ -1358,7 +1734,7 @@ def edit_warning():
         new_icon = data.get("icon")
 
         # Validacija
-        if not movie_folder or movie_folder not in all_films:
+        if not movie_folder or movie_folder not in movies_catalog.films:
             return {"status": "error", "message": "Film ne obstaja"}, 404
 
         # Branje metapodatkov
@@ -1399,7 +1775,7 @@ def edit_warning():
             json.dump(movie_metadata, f, ensure_ascii=False, indent=4)
 
         # Posodobi in-memory
-        all_films[movie_folder]["user_notes"] = movie_metadata["user_notes"]
+        refresh_catalog_entry(movie_folder)
 
         log.info(f"Opozorilo na {movie_folder} je bilo spremenjeno")
         return {
@@ -1425,7 +1801,7 @@ def delete_warning():
         warning_index = data.get("warningIndex")
 
         # Validacija
-        if not movie_folder or movie_folder not in all_films:
+        if not movie_folder or movie_folder not in movies_catalog.films:
             return {"status": "error", "message": "Film ne obstaja"}, 404
 
         # Branje metapodatkov
@@ -1450,7 +1826,7 @@ def delete_warning():
             json.dump(movie_metadata, f, ensure_ascii=False, indent=4)
 
         # Posodobi in-memory
-        all_films[movie_folder]["user_notes"] = movie_metadata["user_notes"]
+        refresh_catalog_entry(movie_folder)
 
         log.info(
             f"Opozorilo '{deleted_note.get('text')}'"
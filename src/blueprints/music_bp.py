@@ -1,30 +1,42 @@
-import glob
+import hashlib
+import json
 import logging
+import math
 import os
 from urllib.parse import quote
 
 from flask import (
     Blueprint,
     abort,
+    jsonify,
     make_response,
     render_template,
+    request,
     send_from_directory,
 )
 from flask_login import current_user, login_required
-from mutagen.easyid3 import EasyID3
-from mutagen.mp3 import MP3, HeaderNotFoundError
 
+from music_index import STORIES_INDEX_FILE, STORIES_ROOT, MusicIndex
+from music_renditions import (
+    OPUS_COOKIE,
+    SOURCE_EXTENSION,
+    pick_rendition,
+    preferred_quality,
+    remove_renditions,
+    rendition_path,
+)
+from radio_hls import is_packaged, playlist_path, remove_package
 from utils import FLASK_ENV, is_current_admin_view, safe_path
 
 log = logging.getLogger(__name__)
 
 music_bp = Blueprint("music", __name__)
 
-# Initialize music
+# Initialize music (oznake se preberejo le za nove ali spremenjene datoteke)
+music_index = MusicIndex("data/music", "data/music_index.json")
+music_tags = music_index.refresh()
 music_albums = {}
-music_files = [
-    f[11:] for f in glob.iglob("data/music/**/*.mp3", recursive=True)
-]
+music_files = list(music_tags)
 MUSIC_COUNT = len(music_files)
 for s in music_files:
     parts = s.split("/")[:-1]
@@ -36,13 +48,7 @@ for s in music_files:
 
 music_metadata = {}
 for file in music_albums["Vse"]:
-    try:
-        audio = MP3(os.path.join("data/music", file), ID3=EasyID3)
-    except HeaderNotFoundError:
-        audio = {}
-    except Exception as e:
-        log.error(f"❌ Napaka pri {file}: {e}")
-        audio = {}
+    audio = music_tags[file]
     genre = file.split("/")[0].strip()
 
     item = {
@@ -68,38 +74,44 @@ music_metadata = {
         ),
     )
 }
+# Pesmi imajo stalne celoštevilske oznake (mesto v music_songs), albumi pa
+# se sklicujejo nanje, namesto da bi za vsako nadrejeno mapo ponavljali poti.
+music_songs = list(music_metadata)
+music_song_ids = {file: i for i, file in enumerate(music_songs)}
 music_albums = [
     {
+        "id": album_id,
         "name": k,
-        "songs": sorted(
-            music_albums[k],
-            key=lambda x: (
-                music_metadata[x]["genre"].lower(),
-                music_metadata[x]["artist"].lower(),
-                music_metadata[x]["album"].lower(),
-                music_metadata[x]["title"].lower(),
-            ),
-        ),
+        "songs": [
+            music_song_ids[x]
+            for x in sorted(
+                music_albums[k],
+                key=lambda x: (
+                    music_metadata[x]["genre"].lower(),
+                    music_metadata[x]["artist"].lower(),
+                    music_metadata[x]["album"].lower(),
+                    music_metadata[x]["title"].lower(),
+                ),
+            )
+        ],
     }
-    for k in (["Vse"] + sorted([m for m in music_albums.keys() if m != "Vse"]))
+    for album_id, k in enumerate(
+        ["Vse"] + sorted([m for m in music_albums.keys() if m != "Vse"])
+    )
 ]
+MUSIC_PAGE_SIZE = 500
+_library_version = None
 
 
 # Initialize radio stories
-radio_stories_files = [
-    f[19:] for f in glob.iglob("data/radio-stories/**/*.mp3", recursive=True)
-]
+radio_stories_index = MusicIndex(STORIES_ROOT, STORIES_INDEX_FILE)
+radio_stories_tags = radio_stories_index.refresh()
+radio_stories_files = list(radio_stories_tags)
 STORIES_COUNT = len(radio_stories_files)
 
 radio_stories_metadata = {}
 for file in radio_stories_files:
-    try:
-        audio = MP3(os.path.join("data/radio-stories", file), ID3=EasyID3)
-    except HeaderNotFoundError:
-        audio = {}
-    except Exception as e:
-        log.error(f"❌ Napaka pri {file}: {e}")
-        audio = {}
+    audio = radio_stories_tags[file]
 
     item = {
         "title": ", ".join(
@@ -107,11 +119,7 @@ for file in radio_stories_files:
         ),
         "artist": " - ".join(audio.get("artist", [])),
         "album": "Radijska zgodba",
-        "duration": int(
-            getattr(getattr(audio, "info", None), "length", 0)
-            if hasattr(audio, "info")
-            else 0
-        ),
+        "duration": int(audio.get("duration", 0)),
     }
     radio_stories_metadata[file] = item
 
@@ -127,38 +135,135 @@ radio_stories_metadata = {
 }
 
 
+def library_version():
+    """Zgoščena vrednost knjižnice; spremeni se ob brisanju pesmi."""
+    global _library_version
+    if _library_version is None:
+        _library_version = hashlib.blake2b(
+            json.dumps(music_metadata).encode("utf-8"), digest_size=8
+        ).hexdigest()
+    return _library_version
+
+
+def visible_albums(admin):
+    return [a for a in music_albums if admin or "Neurejen" not in a["name"]]
+
+
+def visible_songs(album, admin):
+    return [
+        i
+        for i in album["songs"]
+        if admin or not music_metadata[music_songs[i]]["only_admin"]
+    ]
+
+
+def api_response(build, *key):
+    """JSON odgovor z ETag iz različice knjižnice in parametrov."""
+    response = jsonify(build())
+    response.set_etag(
+        hashlib.blake2b(
+            ":".join(map(str, (library_version(), *key))).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+    )
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
 @music_bp.route("/music")
 @login_required
 def music():
-    if not is_current_admin_view(current_user):
-        return render_template(
+    # Albumi in pesmi se naložijo prek /music/api
+    response = make_response(
+        render_template(
             "music_player.html",
             pagetitle="MarinKino - Glasba",
             is_music=True,
-            albums=[a for a in music_albums if "Neurejen" not in a["name"]],
-            music_metadata={
-                k: v for k, v in music_metadata.items() if not v["only_admin"]
-            },
         )
-    return render_template(
-        "music_player.html",
-        pagetitle="MarinKino - Glasba",
-        is_music=True,
-        albums=music_albums,
-        music_metadata=music_metadata,
     )
+    # Namigi o povezavi za izbiro različice pesmi
+    response.headers["Accept-CH"] = "ECT, Save-Data"
+    return response
+
+
+@music_bp.route("/music/api/albums")
+@login_required
+def music_albums_api():
+    admin = is_current_admin_view(current_user)
+
+    def build():
+        return {
+            "albums": [
+                {
+                    "id": album["id"],
+                    "name": album["name"],
+                    "count": len(visible_songs(album, admin)),
+                }
+                for album in visible_albums(admin)
+            ]
+        }
+
+    return api_response(build, "albums", admin)
+
+
+@music_bp.route("/music/api/albums/<int:album_id>")
+@login_required
+def music_album_api(album_id):
+    admin = is_current_admin_view(current_user)
+    album = next(
+        (a for a in visible_albums(admin) if a["id"] == album_id), None
+    )
+    if album is None:
+        abort(404)
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(
+        max(request.args.get("per_page", MUSIC_PAGE_SIZE, type=int), 1),
+        MUSIC_PAGE_SIZE,
+    )
+
+    def build():
+        songs = visible_songs(album, admin)
+        start = (page - 1) * per_page
+        return {
+            "id": album["id"],
+            "name": album["name"],
+            "page": page,
+            "pages": max(math.ceil(len(songs) / per_page), 1),
+            "total": len(songs),
+            "songs": [
+                {
+                    "id": i,
+                    "file": music_songs[i],
+                    "title": music_metadata[music_songs[i]]["title"],
+                    "artist": music_metadata[music_songs[i]]["artist"],
+                    "album": music_metadata[music_songs[i]]["album"],
+                }
+                for i in songs[start : start + per_page]
+            ],
+        }
+
+    return api_response(build, "album", admin, album_id, page, per_page)
 
 
 @music_bp.route("/radio-stories")
 @login_required
 def radio_stories():
     """Separate page for radio stories (Radijske-zgodbe)."""
+    # Dolge zgodbe imajo lahko tudi HLS (pripravi ga prepare_music.py)
+    metadata = {
+        file: (
+            dict(item, hls=playlist_path(file))
+            if is_packaged(os.path.join(STORIES_ROOT, file))
+            else item
+        )
+        for file, item in radio_stories_metadata.items()
+    }
     return render_template(
         "radio_stories.html",
         pagetitle="MarinKino - Radijske zgodbe",
         is_music=True,
-        radio_stories_files=list(radio_stories_metadata.keys()),
-        radio_stories_metadata=radio_stories_metadata,
+        radio_stories_files=list(metadata.keys()),
+        radio_stories_metadata=metadata,
     )
 
 
@@ -171,6 +276,15 @@ def song(filename):
             abort(404)
     except ValueError:
         abort(404)
+    # Različica z nižjo bitno hitrostjo (pripravi jo prepare_music.py)
+    if filename.endswith(SOURCE_EXTENSION):
+        rendition = pick_rendition(
+            os.path.join("data/music", filename),
+            preferred_quality(request.args, request.cookies, request.headers),
+            opus=request.cookies.get(OPUS_COOKIE) == "1",
+        )
+        if rendition:
+            filename = rendition_path(filename, rendition)
     if FLASK_ENV == "production":
         response = make_response()
         safe_filename = quote(filename, safe="/")
@@ -188,14 +302,18 @@ def song(filename):
         response.headers["Content-Type"] = "audio/mpeg"
     elif filename.endswith(".m4a"):
         response.headers["Content-Type"] = "audio/mp4"
+    elif filename.endswith(".opus"):
+        response.headers["Content-Type"] = "audio/ogg"
     elif filename.endswith(".wav"):
         response.headers["Content-Type"] = "audio/wav"
+    response.vary.update(["Cookie", "Save-Data", "ECT"])
     return response
 
 
 @music_bp.route("/music/delete/<path:filename>", methods=["DELETE"])
 @login_required
 def song_remove(filename):
+    global _library_version
     if not is_current_admin_view(current_user):
         return "", 204
     try:
@@ -205,6 +323,14 @@ def song_remove(filename):
     if not os.path.exists(path):
         return "", 404
     os.remove(path)
+    remove_renditions(path)
+    music_index.remove(filename)
+    if music_metadata.pop(filename, None) is not None:
+        song_id = music_song_ids[filename]
+        for album in music_albums:
+            if song_id in album["songs"]:
+                album["songs"].remove(song_id)
+        _library_version = None
     return "", 204
 
 
@@ -236,6 +362,10 @@ def radio_story_file(filename):
         response.headers["Content-Type"] = "audio/mp4"
     elif filename.endswith(".wav"):
         response.headers["Content-Type"] = "audio/wav"
+    elif filename.endswith(".m3u8"):
+        response.headers["Content-Type"] = "application/vnd.apple.mpegurl"
+    elif filename.endswith(".m4s") or filename.endswith(".mp4"):
+        response.headers["Content-Type"] = "audio/mp4"
     return response
 
 
@@ -251,4 +381,7 @@ def radio_story_remove(filename):
     if not os.path.exists(path):
         return "", 404
     os.remove(path)
+    remove_package(path)
+    radio_stories_index.remove(filename)
+    radio_stories_metadata.pop(filename, None)
     return "", 204
@@ -2,105 +2,147 @@
 SEO Blueprint - handles sitemap, robots.txt, and other SEO-related routes
 """
 
-import json
+import hashlib
 import os
-from datetime import date, datetime, timezone
+import threading
+from datetime import date
+from urllib.parse import quote
+from xml.sax.saxutils import escape
 
-from flask import Blueprint
+from flask import Blueprint, abort, make_response, request
+
+from utils import blog_post_store, get_blog_posts, post_modified
 
 seo_bp = Blueprint("seo", __name__)
 
-BLOG_DATA_FILE = os.path.join(
-    os.path.dirname(__file__), "..", "..", "data", "blog_posts.json"
+
+SITEMAP_MAX_URLS = 50000
+SITEMAP_XMLNS = (
+    'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+    ' xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"'
+    ' xmlns:news="http://www.google.com/schemas/sitemap-news/0.9"'
 )
 
+# Sitemap se zgradi enkrat na različico objav in domeno
+_sitemap_cache = {"key": None, "files": {}}
+_sitemap_lock = threading.Lock()
 
-def load_blog_posts():
-    """Load blog posts from JSON file"""
-    if os.path.exists(BLOG_DATA_FILE):
-        with open(BLOG_DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+
+def url_entry(loc, lastmod, changefreq, priority):
+    lines = ["  <url>", f"    <loc>{escape(loc)}</loc>"]
+    if lastmod is not None:
+        lines.append(f"    <lastmod>{lastmod.isoformat()}</lastmod>")
+    lines += [
+        f"    <changefreq>{changefreq}</changefreq>",
+        f"    <priority>{priority}</priority>",
+        "  </url>",
+    ]
+    return "\n".join(lines)
 
 
-def blog_timestamp(blog):
-    """Parse blog timestamp"""
-    timestamp = blog.get("published_at", blog.get("created_at", "")).replace(
-        "Z", "+00:00"
+def sitemap_file(body, lastmod):
+    xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + body
+    etag = hashlib.blake2b(xml.encode("utf-8"), digest_size=16).hexdigest()
+    return xml, etag, lastmod
+
+
+def urlset_file(entries):
+    body = "\n".join(entry for entry, _ in entries)
+    return sitemap_file(
+        f"<urlset {SITEMAP_XMLNS}>\n{body}\n</urlset>",
+        max((lastmod for _, lastmod in entries if lastmod), default=None),
     )
-    try:
-        return datetime.fromisoformat(timestamp)
-    except Exception:
-        return datetime.now(timezone.utc)
 
 
-@seo_bp.route("/sitemap.xml")
-def sitemap():
-    """Generate sitemap.xml for Google Search Console"""
-    domain = os.getenv("WWW_DOMAIN", "localhost")
-    protocol = "https"
+def build_sitemaps(posts, base_url):
+    """Vrne {ime: (xml, etag, lastmod)}. Pri več kot SITEMAP_MAX_URLS
+    naslovih je `sitemap.xml` kazalo, ki kaže na `sitemap-{n}.xml`."""
+    blog_posts = sorted(
+        (
+            (post_id, post_modified(post))
+            for post_id, post in posts.items()
+            if post.get("published", False)
+        ),
+        key=lambda item: item[0],
+    )
+    newest = max((m for _, m in blog_posts if m), default=None)
 
-    # Static pages with priority and change frequency
-    static_pages = [
-        {"url": "/", "priority": 1.0, "changefreq": "weekly"},
-        {"url": "/blog", "priority": 0.9, "changefreq": "daily"},
+    # Statične strani se spremenijo skupaj z najnovejšo objavo
+    entries = [
+        (url_entry(f"{base_url}/", newest, "weekly", 1.0), newest),
+        (url_entry(f"{base_url}/blog", newest, "daily", 0.9), newest),
     ]
-
-    # Build sitemap entries
-    sitemap_entries = []
-
-    # Add static pages
-    for page in static_pages:
-        sitemap_entries.append(
-            {
-                "loc": f"{protocol}://{domain}{page['url']}",
-                "lastmod": datetime.now(timezone.utc).isoformat(),
-                "changefreq": page["changefreq"],
-                "priority": page["priority"],
-            }
+    entries += [
+        (
+            url_entry(
+                f"{base_url}/blog/{quote(post_id)}", lastmod, "monthly", 0.8
+            ),
+            lastmod,
         )
+        for post_id, lastmod in blog_posts
+    ]
+
+    parts = [
+        entries[i : i + SITEMAP_MAX_URLS]
+        for i in range(0, len(entries), SITEMAP_MAX_URLS)
+    ]
+    if len(parts) == 1:
+        return {"sitemap.xml": urlset_file(entries)}
 
-    # Add blog posts
-    posts = load_blog_posts()
-    for post_id, post in posts.items():
-        if post.get("published", False):
-            sitemap_entries.append(
-                {
-                    "loc": f"{protocol}://{domain}/blog/{post_id}",
-                    "lastmod": (
-                        post.get("updated_at")
-                        or post.get("published_at")
-                        or post.get("created_at", "")
-                    ).replace("Z", "+00:00"),
-                    "changefreq": "monthly",
-                    "priority": 0.8,
-                }
+    files = {}
+    index = [
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    ]
+    for number, part in enumerate(parts, start=1):
+        name = f"sitemap-{number}.xml"
+        files[name] = urlset_file(part)
+        index.append(f"  <sitemap>\n    <loc>{base_url}/{name}</loc>")
+        if files[name][2] is not None:
+            index.append(
+                f"    <lastmod>{files[name][2].isoformat()}</lastmod>"
             )
+        index.append("  </sitemap>")
+    index.append("</sitemapindex>")
+    files["sitemap.xml"] = sitemap_file("\n".join(index), newest)
+    return files
+
+
+def get_sitemaps():
+    domain = os.getenv("WWW_DOMAIN", "localhost")
+    posts = get_blog_posts()
+    key = (blog_post_store.version, domain)
+    with _sitemap_lock:
+        if _sitemap_cache["key"] != key:
+            _sitemap_cache["files"] = build_sitemaps(
+                posts, f"https://{domain}"
+            )
+            _sitemap_cache["key"] = key
+        return _sitemap_cache["files"]
+
+
+def sitemap_response(name):
+    sitemap_entry = get_sitemaps().get(name)
+    if sitemap_entry is None:
+        abort(404)
+    xml, etag, lastmod = sitemap_entry
+    response = make_response(xml)
+    response.headers["Content-Type"] = "application/xml; charset=utf-8"
+    response.set_etag(etag)
+    if lastmod is not None:
+        response.last_modified = lastmod
+    return response.make_conditional(request)
 
-    # Generate XML
-    sitemap_xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    sitemap_xml += (
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
-    )
-    sitemap_xml += (
-        ' xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"'
-    )
-    sitemap_xml += (
-        ' xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">\n'
-    )
 
-    for entry in sitemap_entries:
-        sitemap_xml += "  <url>\n"
-        sitemap_xml += f"    <loc>{entry['loc']}</loc>\n"
-        if entry.get("lastmod"):
-            sitemap_xml += f"    <lastmod>{entry['lastmod']}</lastmod>\n"
-        sitemap_xml += f"    <changefreq>{entry['changefreq']}</changefreq>\n"
-        sitemap_xml += f"    <priority>{entry['priority']}</priority>\n"
-        sitemap_xml += "  </url>\n"
+@seo_bp.route("/sitemap.xml")
+def sitemap():
+    """Generate sitemap.xml for Google Search Console"""
+    return sitemap_response("sitemap.xml")
 
-    sitemap_xml += "</urlset>"
 
-    return sitemap_xml, 200, {"Content-Type": "application/xml; charset=utf-8"}
+@seo_bp.route("/sitemap-<int:number>.xml")
+def sitemap_part(number):
+    """Del sitemapa, kadar je naslovov več kot SITEMAP_MAX_URLS"""
+    return sitemap_response(f"sitemap-{number}.xml")
 
 
 @seo_bp.route("/robots.txt")
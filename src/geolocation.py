@@ -0,0 +1,215 @@
+"""
+Določanje lokacije obiskovalcev bloga izven poti zahteve.
+
+`after_request` le doda IP naslov v Redis vrsto `GEO_QUEUE_KEY`. Nit
+`GeolocationWorker` vrsto prazni. Naslove najprej išče v lokalni bazi
+MaxMind (`GEOIP_DATABASE`), če je ta na voljo. Šele nato vpraša ipinfo.io.
+Rezultati se hranijo v predpomnilniku LRU z omejenim časom veljavnosti.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+import requests
+
+from blog_views import record_view
+from utils import FLASK_ENV, STATS_TTL, redis_client
+
+log = logging.getLogger(__name__)
+
+GEO_QUEUE_KEY = "geo:queue"
+GEO_QUEUE_MAX = 10000
+GEOIP_DATABASE = os.getenv("GEOIP_DATABASE", "data/GeoLite2-City.mmdb")
+
+UNKNOWN_LOCATION = {
+    "country": "Unknown",
+    "city": "Unknown",
+    "region": "Unknown",
+}
+
+
+class TTLCache:
+    """Predpomnilnik LRU, katerega vnosi po `ttl` sekundah zastarijo."""
+
+    def __init__(self, maxsize=10000, ttl=7 * 24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+_geo_database = None
+_geo_database_checked = False
+
+
+def get_geo_database():
+    """Odpre lokalno bazo MaxMind ali vrne None, če je ni."""
+    global _geo_database, _geo_database_checked
+    if not _geo_database_checked:
+        _geo_database_checked = True
+        if os.path.exists(GEOIP_DATABASE):
+            try:
+                import maxminddb
+
+                _geo_database = maxminddb.open_database(GEOIP_DATABASE)
+            except Exception as e:
+                log.error(f"❌ Napaka pri odpiranju {GEOIP_DATABASE}: {e}")
+    return _geo_database
+
+
+def location_from_database(ip):
+    database = get_geo_database()
+    if database is None:
+        return None
+    try:
+        record = database.get(ip)
+    except ValueError:
+        return None
+    if not record or "country" not in record:
+        return None
+
+    def name(entry):
+        return (entry or {}).get("names", {}).get("en", "Unknown")
+
+    location = record.get("location", {})
+    return {
+        "country": record["country"].get("iso_code", "Unknown"),
+        "city": name(record.get("city")),
+        "region": name((record.get("subdivisions") or [None])[0]),
+        "geolocation": (
+            f"{location['latitude']},{location['longitude']}"
+            if "latitude" in location
+            else None
+        ),
+        "postal": record.get("postal", {}).get("code"),
+    }
+
+
+last_timeout_time = 0
+
+
+def location_from_ipinfo(ip):
+    """Get location info from IP address using ipinfo.io
+    (free tier: 50k requests/month)"""
+    global last_timeout_time
+    if time.time() - last_timeout_time < 60 * 60:
+        return dict(UNKNOWN_LOCATION)
+    try:
+        response = requests.get(f"https://ipinfo.io/{ip}/json", timeout=5)
+        if response.status_code == 200:
+            data = response.json()
+            if "error" in data:
+                log.warning(f"ipinfo.io error: {data}")
+                return dict(UNKNOWN_LOCATION)
+            return {
+                "country": data.get("country", "Unknown"),
+                "city": data.get("city", "Unknown"),
+                "region": data.get("region", "Unknown"),
+                "geolocation": data.get("loc"),
+                "postal": data.get("postal"),
+            }
+        else:
+            if response.status_code == 429:
+                last_timeout_time = time.time()
+                log.warning("ipinfo.io rate limit exceeded")
+            else:
+                log.warning(
+                    f"ipinfo.io request failed"
+                    f" with status {response.status_code} and"
+                    f" response content: {response.text}"
+                )
+    except Exception as e:
+        if "timeout" in str(e).lower():
+            last_timeout_time = time.time()
+            log.error("ipinfo.io timeout")
+        else:
+            log.error(f"Error getting geolocation: {str(e)}")
+    return dict(UNKNOWN_LOCATION)
+
+
+_location_cache = TTLCache()
+
+
+def get_location_from_ip(ip):
+    """Lokacija IP naslova: predpomnilnik, lokalna baza, nato ipinfo.io."""
+    if FLASK_ENV != "production":
+        return {"country": "SI", "city": "Ljubljana", "region": "Unknown"}
+    location = _location_cache.get(ip)
+    if location is None:
+        location = location_from_database(ip) or location_from_ipinfo(ip)
+        if location["country"] != "Unknown":
+            _location_cache.set(ip, location)
+    return location
+
+
+def queue_entry(client_ip, today, post_id=""):
+    return f"{today} {client_ip} {post_id}".rstrip()
+
+
+def record_geolocation(entry):
+    """Zapiše lokacijo IP naslova ob prvem obisku bloga v dnevu in ogled
+    objave šteje med slovenske, če je obiskovalec iz Slovenije."""
+    today, client_ip, *post_id = entry.split(" ")
+    known = redis_client.hget(f"stats:geo:{today}", client_ip)
+    if known is not None:
+        location = json.loads(known)
+    else:
+        location = get_location_from_ip(client_ip)
+        if location["country"] != "Unknown":
+            redis_client.hset(
+                f"stats:geo:{today}", client_ip, json.dumps(location)
+            )
+            redis_client.expire(f"stats:geo:{today}", STATS_TTL)
+    if post_id and location.get("country") == "SI":
+        record_view(post_id[0], client_ip, today, si=True)
+
+
+class GeolocationWorker(threading.Thread):
+    """Nit, ki prazni vrsto IP naslovov in zanje zapiše lokacije."""
+
+    def __init__(self, timeout=5):
+        super().__init__(name="geo-worker", daemon=True)
+        self.timeout = timeout
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                item = redis_client.blpop(GEO_QUEUE_KEY, timeout=self.timeout)
+            except redis.RedisError as e:
+                log.error(f"❌ Napaka pri branju vrste lokacij: {e}")
+                self._stop_event.wait(self.timeout)
+                continue
+            if item is None:
+                continue
+            try:
+                record_geolocation(item[1])
+            except Exception as e:
+                log.error(f"❌ Napaka pri določanju lokacije: {e}")
+
+    def stop(self):
+        self._stop_event.set()
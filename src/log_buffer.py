@@ -0,0 +1,115 @@
+"""
+Zadnji zapisi strežniškega dnevnika za nadzorno ploščo.
+
+`LogRingBuffer` je logging handler, ki hrani zadnjih nekaj tisoč zapisov
+v pomnilniku. Če ni nameščen (ali je še prazen), `tail_lines` prebere
+le konec datoteke dnevnika z iskanjem od zadaj, zato nadzorna plošča
+nikoli ne bere ali prepisuje cele datoteke, v katero piše FileHandler.
+"""
+
+import logging
+import os
+from collections import deque
+
+LOG_FORMAT = "%(asctime)s - 1 - [%(levelname)s] - %(name)s: %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+QUEUE_DEPTH_MESSAGE = "waitress.queue: Task queue depth is"
+
+
+class LogRingBuffer(logging.Handler):
+    """Handler, ki hrani zadnjih `capacity` oblikovanih zapisov."""
+
+    def __init__(self, capacity=5000):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+
+    def emit(self, record):
+        try:
+            self.records.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def lines(self):
+        return list(self.records)
+
+
+log_buffer = LogRingBuffer()
+
+
+def install_log_buffer(logger=None):
+    """Doda `log_buffer` korenskemu (ali podanemu) loggerju."""
+    logger = logger or logging.getLogger()
+    if log_buffer not in logger.handlers:
+        logger.addHandler(log_buffer)
+    return log_buffer
+
+
+def tail_lines(path, count, block_size=8192):
+    """Vrne zadnjih `count` vrstic datoteke; bere bloke od konca proti
+    začetku, dokler ne zbere dovolj vrstic."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.split(b"\n")
+    if position > 0:
+        lines = lines[1:]
+    if lines and not lines[-1]:
+        lines = lines[:-1]
+    return [line.decode("utf-8", errors="replace") for line in lines[-count:]]
+
+
+def is_quiet_queue_depth(line):
+    if QUEUE_DEPTH_MESSAGE not in line:
+        return False
+    try:
+        return int(line.rsplit(" ", 1)[-1]) < 10
+    except ValueError:
+        return False
+
+
+def collapse_log_lines(lines, limit=100):
+    """Zaporedne enake zapise združi v enega ("od <-> do - Nx - ...").
+
+    Vrstice obdela od najnovejše nazaj in se ustavi, ko ima `limit`
+    združenih zapisov, zato je cena sorazmerna z rezultatom.
+    """
+    entries = []
+    for line in reversed(lines):
+        if is_quiet_queue_depth(line):
+            continue
+        parts = line.split(" - ", 3)
+        last = entries[-1] if entries else None
+        if (
+            last is not None
+            and len(parts) == 4
+            and len(last) == 4
+            and parts[2:] == last[2:]
+            and parts[1].rstrip("x").isdigit()
+            and last[1].rstrip("x").isdigit()
+        ):
+            last[0] = parts[0] + " <-> " + last[0].split(" <-> ")[-1]
+            last[1] = (
+                str(int(last[1].rstrip("x")) + int(parts[1].rstrip("x"))) + "x"
+            )
+            continue
+        if len(entries) == limit:
+            break
+        entries.append(parts)
+    return "\n".join(" - ".join(entry) for entry in reversed(entries))
+
+
+def recent_log(path, limit=100):
+    """Zadnjih `limit` združenih zapisov dnevnika."""
+    lines = log_buffer.lines()
+    if not lines:
+        if not os.path.exists(path):
+            return "Missing log file!"
+        lines = tail_lines(path, limit * 20)
+    return collapse_log_lines(lines, limit)
@@ -0,0 +1,44 @@
+import argparse
+import logging
+
+from utils import decode_progress, encode_progress, redis_client
+
+log = logging.getLogger(__name__)
+
+
+def migrate_progress(dry_run=False):
+    """Prepiše napredek ogledov iz oblike JSON v stisnjeno obliko."""
+    keys = 0
+    migrated = 0
+    for key in redis_client.scan_iter(match="prog:*", count=500):
+        keys += 1
+        packed = {}
+        for field, value in redis_client.hgetall(key).items():
+            if not value.startswith("{"):
+                continue
+            try:
+                packed[field] = encode_progress(decode_progress(value))
+            except ValueError as e:
+                log.error(f"❌ Napaka pri pretvorbi {key} {field}: {e}")
+        if packed and not dry_run:
+            redis_client.hset(key, mapping=packed)
+        migrated += len(packed)
+    log.info(
+        f"✅ Pregledanih {keys} uporabnikov, pretvorjenih {migrated} zapisov"
+        + (" (brez zapisovanja)" if dry_run else "")
+    )
+    return migrated
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(
+        description="Pretvorba napredka ogledov MarinKino v stisnjeno obliko"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="samo preštej zapise, ki bi jih pretvoril",
+    )
+    args = parser.parse_args()
+    migrate_progress(dry_run=args.dry_run)
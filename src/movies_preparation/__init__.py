@@ -1,3 +1,4 @@
+from .catalog import collect_films  # noqa: F401
 from .config import FILMS_ROOT  # noqa: F401
 from .helpers import is_ffmpeg_installed  # noqa: F401
 from .main import check_folder  # noqa: F401
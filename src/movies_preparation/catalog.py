@@ -0,0 +1,188 @@
+"""
+Branje kataloga filmov za spletni strežnik.
+
+Modul uvaža le, kar je potrebno za branje že pripravljenih map s filmi, zato
+se ob zagonu strežnika ne naložijo knjižnice za pripravo (podnapisi,
+prevajanje, obdelava zvoka).
+
+Katalog se hrani kot posnetek (pickle) v `CATALOG_FILE`. Pripravi ga
+`prepare_movies.py`, strežnik pa ga ob zagonu le prebere. Počasen sprehod
+po mapah s filmi ostane kot rezervna možnost, če posnetka ni ali je
+zastarele oblike.
+
+Vsak film v posnetku ima podpis (čase sprememb mape in `readme.json`), zato
+lahko `find_changed_films` hitro najde filme, ki jih je treba prebrati
+ponovno, `CatalogWatcher` pa to preverja v ozadju.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from .config import FILMS_ROOT
+from .get_movie_metadata import MovieMetadata
+
+log = logging.getLogger(__name__)
+
+# Ob spremembi oblike zapisa povečaj verzijo, da se stari posnetki zavržejo
+CATALOG_VERSION = 2
+CATALOG_FILE = os.path.join(FILMS_ROOT, "catalog.pickle")
+
+_catalog_file_lock = threading.Lock()
+
+
+def list_group_folders(folder):
+    """Vrne podmape (skupine filmov) v korenski mapi s filmi."""
+    folder_path = Path(folder)
+    return sorted(
+        [f for f in folder_path.iterdir() if f.is_dir()], reverse=True
+    )
+
+
+def list_film_folders(group_folder):
+    """Vrne mape posameznih filmov v skupini."""
+    return sorted(
+        [f for f in Path(group_folder).iterdir() if f.is_dir()], reverse=True
+    )
+
+
+def list_all_film_folders(folder):
+    """Vrne poti do vseh map s filmi v enakem vrstnem redu kot katalog."""
+    return [
+        str(film)
+        for subfolder in list_group_folders(folder)
+        for film in list_film_folders(subfolder)
+    ]
+
+
+def collect_films(folder):
+    """Prebere metapodatke vseh filmov brez kakršnekoli priprave datotek."""
+    return [MovieMetadata(film) for film in list_all_film_folders(folder)]
+
+
+def film_signature(film_folder):
+    """Časa sprememb mape filma in njenega readme.json.
+
+    Mapa se spremeni ob dodajanju ali brisanju datotek, readme.json pa ob
+    urejanju metapodatkov (ocene, komentarji, priporočila).
+    """
+    try:
+        folder_mtime = os.stat(film_folder).st_mtime_ns
+    except OSError:
+        return None
+    try:
+        readme_mtime = os.stat(
+            os.path.join(film_folder, "readme.json")
+        ).st_mtime_ns
+    except OSError:
+        readme_mtime = 0
+    return folder_mtime, readme_mtime
+
+
+def read_film(film_folder):
+    """Prebere en film za katalog skupaj z njegovim podpisom."""
+    signature = film_signature(film_folder)
+    film = MovieMetadata(str(film_folder)).to_dict()
+    film["signature"] = signature
+    return film
+
+
+def find_changed_films(films, folder=FILMS_ROOT):
+    """Primerja podpise filmov v katalogu s stanjem na disku.
+
+    Vrne seznam map, ki jih je treba prebrati na novo (spremenjene ali
+    nove), in seznam map filmov, ki jih ni več.
+    """
+    known = {film["folder"]: film.get("signature") for film in films}
+    on_disk = list_all_film_folders(folder)
+    changed = [
+        film_folder
+        for film_folder in on_disk
+        if film_folder not in known
+        or film_signature(film_folder) != known[film_folder]
+    ]
+    existing = set(on_disk)
+    removed = [
+        film_folder for film_folder in known if film_folder not in existing
+    ]
+    return changed, removed
+
+
+def read_catalog(catalog_file=CATALOG_FILE):
+    """Prebere posnetek kataloga ali vrne None, če ni uporaben."""
+    try:
+        with open(catalog_file, "rb") as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.error(f"❌ Napaka pri branju kataloga {catalog_file}: {e}")
+        return None
+
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("version") != CATALOG_VERSION
+    ):
+        log.warning(f"⚠️ Katalog {catalog_file} je zastarele oblike.")
+        return None
+    return snapshot
+
+
+def write_catalog(films, catalog_file=CATALOG_FILE):
+    """Atomarno zapiše posnetek kataloga (seznam slovarjev filmov)."""
+    snapshot = {
+        "version": CATALOG_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "films": films,
+    }
+    with _catalog_file_lock:
+        tmp_file = f"{catalog_file}.tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, catalog_file)
+    return snapshot
+
+
+def build_catalog(folder=FILMS_ROOT, catalog_file=CATALOG_FILE):
+    """Sprehodi se po mapah s filmi in na novo zapiše posnetek kataloga."""
+    films = [read_film(film) for film in list_all_film_folders(folder)]
+    write_catalog(films, catalog_file)
+    log.info(f"📚 Katalog z {len(films)} filmi zapisan v {catalog_file}")
+    return films
+
+
+def load_films(folder=FILMS_ROOT, catalog_file=CATALOG_FILE):
+    """Vrne seznam filmov iz posnetka, sicer jih prebere iz map."""
+    snapshot = read_catalog(catalog_file)
+    if snapshot is not None:
+        return snapshot["films"]
+
+    log.warning("⚠️ Ni uporabnega kataloga, berem mape s filmi.")
+    try:
+        return build_catalog(folder, catalog_file)
+    except OSError as e:
+        log.error(f"❌ Katalog ni bil zapisan: {e}")
+        return [read_film(film) for film in list_all_film_folders(folder)]
+
+
+class CatalogWatcher(threading.Thread):
+    """Nit v ozadju, ki v rednih presledkih pokliče `check_changes`."""
+
+    def __init__(self, check_changes, interval=60):
+        super().__init__(name="catalog-watcher", daemon=True)
+        self.check_changes = check_changes
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check_changes()
+            except Exception as e:
+                log.error(f"❌ Napaka pri osveževanju kataloga: {e}")
+
+    def stop(self):
+        self._stop_event.set()
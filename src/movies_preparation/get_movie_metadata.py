@@ -8,8 +8,6 @@ from difflib import SequenceMatcher
 from pathlib import Path
 
 import requests
-from google.cloud import translate_v2 as translate
-from langdetect import detect
 from PIL import Image
 
 log = logging.getLogger(__name__)
@@ -206,14 +204,25 @@ def get_imdb_id_from_tmdb(tmdb_id, media_type="movie"):
     return imdb_id
 
 
-translate_client = translate.Client()
+_translate_client = None
+
+
+def get_translate_client():
+    global _translate_client
+    if _translate_client is None:
+        from google.cloud import translate_v2 as translate
+
+        _translate_client = translate.Client()
+    return _translate_client
 
 
 def translate_text(text, target_language="sl"):
     if not text:
         return ""
 
-    result = translate_client.translate(text, target_language=target_language)
+    result = get_translate_client().translate(
+        text, target_language=target_language
+    )
     return result[
         "translatedText"
     ]  # TODO: previdno uporabi za opise, lahko je drago
@@ -340,6 +349,8 @@ def get_movie_metadata(folder, film, video_files):
     )
 
     # Prevajanje opisa v slovenščino, če je zaznana angleščina
+    from langdetect import detect
+
     if result["Plot"] and detect(result["Plot"]) != "sl":
         result["Plot - translated"] = translate_text(result.get("Plot", ""))
 
@@ -388,6 +399,27 @@ def get_movie_metadata(folder, film, video_files):
 
 class MovieMetadata:
     SUPPORTED_VIDEO = {".avi", ".mp4", ".mkv", ".vob"}
+    # Polja, ki se shranijo v katalog za spletni strežnik
+    CATALOG_FIELDS = (
+        "folder",
+        "cover",
+        "thumbnail",
+        "title",
+        "original_title",
+        "year",
+        "plot",
+        "players",
+        "runtimes",
+        "runtimes_by_files",
+        "slosinh",
+        "genres",
+        "video_files",
+        "subtitles",
+        "recommendation_level",
+        "user_notes",
+        "is_chosen_series",
+        "ratings",
+    )
 
     def __init__(self, folder):
         self.folder = folder
@@ -451,3 +483,7 @@ class MovieMetadata:
         self.user_notes = metadata.get("user_notes", {})
 
         self.ratings = metadata.get("ratings", {})
+
+    def to_dict(self):
+        """Vrne podatke filma, ki jih potrebuje spletni strežnik."""
+        return {field: getattr(self, field) for field in self.CATALOG_FIELDS}
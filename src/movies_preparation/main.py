@@ -1,10 +1,9 @@
 import logging
-from pathlib import Path
 
 import tqdm
 
+from .catalog import collect_films, list_film_folders, list_group_folders
 from .get_movie_metadata import MovieMetadata
-from .subtitles import prepare_subtitles
 from .video_converter import convert_to_m3u8, convert_videos
 
 log = logging.getLogger(__name__)
@@ -15,6 +14,10 @@ def check_film(film_folder, only_collect_metadata=True):
         not only_collect_metadata
         and "0x-neurejeni-filmi" in str(film_folder).lower()
     ):
+        # Podnapisi potrebujejo težke knjižnice (numba, scipy, gemini ...),
+        # zato jih uvozimo šele ob dejanski pripravi filmov.
+        from .subtitles import prepare_subtitles
+
         videos = convert_videos(str(film_folder))
 
         if videos:
@@ -31,23 +34,18 @@ def check_film(film_folder, only_collect_metadata=True):
 
 
 def check_folder(folder, only_collect_metadata=True):
-    folder_path = Path(folder)
+    if only_collect_metadata:
+        return collect_films(folder)
+
     output_films = []
 
-    for subfolder in sorted(
-        [f for f in folder_path.iterdir() if f.is_dir()], reverse=True
-    ):
-        film_folders = sorted(
-            [f for f in subfolder.iterdir() if f.is_dir()], reverse=True
-        )
+    for subfolder in list_group_folders(folder):
+        film_folders = list_film_folders(subfolder)
 
         if film_folders:
-            film_iterator = (
-                tqdm.tqdm(film_folders, desc=f"Procesiram {subfolder.name}")
-                if not only_collect_metadata
-                else film_folders
-            )
-            for film in film_iterator:
+            for film in tqdm.tqdm(
+                film_folders, desc=f"Procesiram {subfolder.name}"
+            ):
                 movie_data = check_film(film, only_collect_metadata)
                 if movie_data:
                     output_films.append(movie_data)
@@ -0,0 +1,112 @@
+"""
+Iskalni indeks naslovov filmov iz trigramov.
+
+Naslovi se poenostavijo (male črke, brez šumnikov in ločil) in razbijejo na
+trigrame posameznih besed. Za vsak trigram hranimo seznam naslovov, v
+katerih se pojavi, zato iskanje pregleda le naslove s skupnimi trigrami.
+
+Ocena sledi prejšnjemu iskanju z difflib: podobnost je največja med
+naslovom in izvirnim naslovom, zadetek podniza doda 0.3, prikažejo pa se
+filmi z oceno nad 0.4. Podobnost je zdaj Dicev koeficient trigramov namesto
+razmerja difflib, zato se vrstni red zadetkov lahko razlikuje: tipkarske
+napake in premešane besede štejejo drugače. Naslovi, ki vsebujejo poizvedbo,
+so med kandidati tudi brez skupnih trigramov (npr. kratke poizvedbe) in
+dobijo vsaj razmerje, ki bi ga dal difflib, zato se še vedno prikažejo.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+SUBSTRING_BOOST = 0.3
+MIN_SCORE = 0.4
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def fold(text):
+    """Male črke brez diakritičnih znakov (č -> c, š -> s, ž -> z)."""
+    text = unicodedata.normalize("NFKD", text.lower()).replace("đ", "d")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def trigrams(folded_text):
+    """Trigrami besed, obdanih s presledki, da šteje tudi začetek besede."""
+    grams = set()
+    for word in folded_text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    """Obrnjen indeks trigramov za hitro iskanje po naslovih."""
+
+    __slots__ = ("items", "texts", "sizes", "owners", "postings")
+
+    def __init__(self, items):
+        """`items` je zaporedje parov (objekt, naslovi objekta)."""
+        self.items = []
+        self.texts = []
+        self.sizes = []
+        self.owners = []
+        postings = {}
+        for item_id, (item, titles) in enumerate(items):
+            self.items.append(item)
+            for title in titles:
+                text = fold(title or "")
+                if not text:
+                    continue
+                grams = trigrams(text)
+                text_id = len(self.texts)
+                self.texts.append(text)
+                self.sizes.append(len(grams))
+                self.owners.append(item_id)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(text_id)
+        self.postings = {g: tuple(ids) for g, ids in postings.items()}
+
+    def replace(self, item_id, item):
+        """Zamenja objekt z enakimi naslovi (indeks ostane enak)."""
+        self.items[item_id] = item
+
+    def search(self, query, min_score=MIN_SCORE):
+        """Vrne seznam parov (ocena, objekt), urejen od najboljšega."""
+        query = fold(query)
+        if not query:
+            return []
+        query_grams = trigrams(query)
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scores = {
+            text_id: 2 * count / (len(query_grams) + self.sizes[text_id])
+            for text_id, count in shared.items()
+        }
+        boosted = set()
+        for text_id, text in enumerate(self.texts):
+            if query in text:
+                boosted.add(self.owners[text_id])
+                # Razmerje difflib za podniz: skupni blok dolžine poizvedbe
+                scores[text_id] = max(
+                    scores.get(text_id, 0),
+                    2 * len(query) / (len(query) + len(text)),
+                )
+
+        best = {}
+        for text_id, score in scores.items():
+            item_id = self.owners[text_id]
+            if score > best.get(item_id, 0):
+                best[item_id] = score
+
+        results = []
+        for item_id, score in best.items():
+            if item_id in boosted:
+                score += SUBSTRING_BOOST
+            if score > min_score:
+                results.append((score, item_id))
+        results.sort(key=lambda r: (-r[0], r[1]))
+        return [(score, self.items[item_id]) for score, item_id in results]
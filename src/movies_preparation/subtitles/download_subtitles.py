@@ -7,16 +7,25 @@ import zipfile
 
 import requests
 from bs4 import BeautifulSoup
-from opensubtitlescom import OpenSubtitles
 
 log = logging.getLogger(__name__)
 
 OPENSUBTITLESCOM_TOKEN = os.getenv("OPENSUBTITLESCOM_TOKEN")
 OPENSUBTITLESCOM_PASSWORD = os.getenv("OPENSUBTITLESCOM_PASSWORD")
-osub = OpenSubtitles("MarinKino", OPENSUBTITLESCOM_TOKEN)
+_osub = None
+
+
+def get_osub():
+    global _osub
+    if _osub is None:
+        from opensubtitlescom import OpenSubtitles
+
+        _osub = OpenSubtitles("MarinKino", OPENSUBTITLESCOM_TOKEN)
+    return _osub
 
 
 def search_opensubtitles(imdb_id, languages=("sl", "en"), num=3):
+    osub = get_osub()
     osub.login("anzem", OPENSUBTITLESCOM_PASSWORD)
     results = []
     for lang in languages:
@@ -46,7 +55,7 @@ def search_opensubtitles(imdb_id, languages=("sl", "en"), num=3):
 
 
 def download_opensubtitles(sub, i, path):
-    data = osub.download(sub["url"])
+    data = get_osub().download(sub["url"])
     filename = f"{path}/subtitle{i}.{sub['lang']}.srt"
     with open(filename, "wb") as f:
         f.write(data)
@@ -0,0 +1,140 @@
+"""
+Trajni indeks oznak (ID3) in trajanj MP3 datotek.
+
+Branje oznak vseh pesmi ob vsakem zagonu strežnika je počasno (vsaka
+datoteka pomeni nekaj iskanj po disku), zato se oznake hranijo v datoteki
+JSON skupaj z velikostjo in časom spremembe datoteke. Ob zagonu se na novo
+(vzporedno) preberejo le nove ali spremenjene datoteke, izbrisane pa se iz
+indeksa odstranijo.
+"""
+
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+# Ob spremembi oblike zapisa povečaj verzijo, da se stari indeksi zavržejo
+INDEX_VERSION = 1
+TAG_KEYS = ("title", "artist", "album")
+READ_WORKERS = int(os.getenv("MUSIC_INDEX_WORKERS", "8"))
+STORIES_ROOT = "data/radio-stories"
+STORIES_INDEX_FILE = "data/radio_stories_index.json"
+
+
+def read_tags(path):
+    """Oznake (seznami vrednosti) in trajanje v sekundah ene MP3 datoteke."""
+    # mutagen je potreben le za nove ali spremenjene datoteke
+    from mutagen.easyid3 import EasyID3
+    from mutagen.mp3 import MP3, HeaderNotFoundError
+
+    try:
+        audio = MP3(path, ID3=EasyID3)
+    except HeaderNotFoundError:
+        return {}
+    except Exception as e:
+        log.error(f"❌ Napaka pri {path}: {e}")
+        return {}
+    tags = {}
+    for key in TAG_KEYS:
+        values = audio.get(key)
+        if values:
+            tags[key] = list(values)
+    tags["duration"] = audio.info.length
+    return tags
+
+
+class MusicIndex:
+    """Oznake MP3 datotek v mapi `root`, shranjene v `index_file`."""
+
+    def __init__(self, root, index_file):
+        self.root = root
+        self.index_file = index_file
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def scan(self):
+        """Vrne {relativna pot: (velikost, čas spremembe)} datotek na disku."""
+        files = {}
+        pattern = os.path.join(glob.escape(self.root), "**", "*.mp3")
+        for path in sorted(glob.iglob(pattern, recursive=True)):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+            files[rel] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def read_index(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            log.error(f"❌ Napaka pri branju indeksa {self.index_file}: {e}")
+            return {}
+        if index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("files", {})
+
+    def write_index(self):
+        """Atomarno zapiše indeks; napaka pri pisanju ne ustavi strežnika."""
+        directory = os.path.dirname(self.index_file) or "."
+        try:
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=directory,
+                prefix=".music_index.",
+                suffix=".tmp",
+                delete=False,
+            ) as f:
+                json.dump(
+                    {"version": INDEX_VERSION, "files": self.entries},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(f.name, self.index_file)
+        except OSError as e:
+            log.error(f"❌ Indeks {self.index_file} ni bil zapisan: {e}")
+
+    def refresh(self):
+        """Posodobi indeks s stanjem na disku in vrne {pot: oznake}."""
+        with self._lock:
+            stored = self.read_index()
+            files = self.scan()
+            changed = [
+                rel
+                for rel, (size, mtime) in files.items()
+                if rel not in stored
+                or stored[rel].get("size") != size
+                or stored[rel].get("mtime") != mtime
+            ]
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+                tags = pool.map(
+                    read_tags,
+                    [os.path.join(self.root, rel) for rel in changed],
+                )
+                for rel, item in zip(changed, tags):
+                    size, mtime = files[rel]
+                    stored[rel] = dict(item, size=size, mtime=mtime)
+            self.entries = {rel: stored[rel] for rel in files}
+            if changed or len(stored) != len(files):
+                self.write_index()
+                log.info(
+                    f"🎵 Indeks {self.index_file}: {len(files)} datotek, "
+                    f"na novo prebranih {len(changed)}"
+                )
+        return self.entries
+
+    def remove(self, rel):
+        """Odstrani izbrisano datoteko iz indeksa."""
+        with self._lock:
+            if self.entries.pop(rel, None) is not None:
+                self.write_index()
@@ -0,0 +1,182 @@
+"""
+Različice pesmi z nižjo bitno hitrostjo za poslušanje na mobilnih podatkih.
+
+Izvirniki v `data/music` so MP3 s 320 kbps. `prepare_music.py` ob vsaki
+pesmi pripravi še različice AAC in Opus (npr. `pesem.aac-96.m4a` ob
+`pesem.mp3`), strežnik pa ob zahtevi za pesem izbere različico glede na
+nastavitev kakovosti (piškotek `music_quality`) ali namige odjemalca
+(`Save-Data`, `ECT`). Če ustrezne različice ni ali je starejša od
+izvirnika, se pošlje izvirnik.
+"""
+
+import glob
+import logging
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+MUSIC_ROOT = "data/music"
+SOURCE_EXTENSION = ".mp3"
+
+RENDITIONS = {
+    "opus-64": {
+        "extension": ".opus",
+        "options": ["-c:a", "libopus", "-b:a", "64k", "-f", "ogg"],
+    },
+    "aac-96": {
+        "extension": ".m4a",
+        "options": [
+            "-c:a",
+            "aac",
+            "-b:a",
+            "96k",
+            "-movflags",
+            "+faststart",
+            "-f",
+            "mp4",
+        ],
+    },
+    "aac-160": {
+        "extension": ".m4a",
+        "options": [
+            "-c:a",
+            "aac",
+            "-b:a",
+            "160k",
+            "-movflags",
+            "+faststart",
+            "-f",
+            "mp4",
+        ],
+    },
+}
+# Različice po kakovosti v vrstnem redu prednosti; "high" je izvirnik
+QUALITIES = {
+    "low": ["opus-64", "aac-96"],
+    "medium": ["aac-160"],
+    "high": [],
+}
+QUALITY_COOKIE = "music_quality"
+OPUS_COOKIE = "music_opus"
+
+
+def rendition_path(source, name):
+    """Pot do različice `name` ob izvirniku `source`."""
+    stem = source[: -len(SOURCE_EXTENSION)]
+    return f"{stem}.{name}{RENDITIONS[name]['extension']}"
+
+
+def is_fresh(source, rendition):
+    """Ali različica obstaja in je novejša od izvirnika."""
+    try:
+        return os.stat(rendition).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+
+def preferred_quality(args, cookies, headers):
+    """Kakovost iz zahteve: parameter, nastavitev ali namigi odjemalca."""
+    quality = args.get("quality") or cookies.get(QUALITY_COOKIE)
+    if quality in QUALITIES:
+        return quality
+    ect = headers.get("ECT", "")
+    if headers.get("Save-Data", "").lower() == "on" or ect in (
+        "slow-2g",
+        "2g",
+    ):
+        return "low"
+    if ect == "3g":
+        return "medium"
+    return "high"
+
+
+def pick_rendition(source, quality, opus=False):
+    """Ime najprimernejše sveže različice ali None za izvirnik."""
+    for name in QUALITIES.get(quality, []):
+        if name.startswith("opus") and not opus:
+            continue
+        if is_fresh(source, rendition_path(source, name)):
+            return name
+    return None
+
+
+def remove_renditions(source):
+    if not source.endswith(SOURCE_EXTENSION):
+        return
+    for name in RENDITIONS:
+        try:
+            os.remove(rendition_path(source, name))
+        except FileNotFoundError:
+            pass
+
+
+def transcode(source, name):
+    """Pripravi različico prek začasne datoteke (nikoli napol zapisane)."""
+    target = rendition_path(source, name)
+    tmp_file = os.path.join(
+        os.path.dirname(target), f".{os.path.basename(target)}.tmp"
+    )
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-y",
+        "-v",
+        "error",
+        "-i",
+        source,
+        "-map",
+        "0:a:0",
+        "-map_metadata",
+        "0",
+        *RENDITIONS[name]["options"],
+        tmp_file,
+    ]
+    try:
+        subprocess.run(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+        os.replace(tmp_file, target)
+        return True
+    except (OSError, subprocess.CalledProcessError) as e:
+        log.error(f"❌ Napaka pri pripravi {target}: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
+
+
+def remove_orphans(root=MUSIC_ROOT):
+    """Odstrani različice pesmi, katerih izvirnika ni več."""
+    removed = 0
+    for name, rendition in RENDITIONS.items():
+        suffix = f".{name}{rendition['extension']}"
+        pattern = os.path.join(glob.escape(root), "**", f"*{suffix}")
+        for path in glob.iglob(pattern, recursive=True):
+            if not os.path.exists(path[: -len(suffix)] + SOURCE_EXTENSION):
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def prepare_renditions(root=MUSIC_ROOT, workers=None):
+    """Vzporedno pripravi manjkajoče in zastarele različice vseh pesmi."""
+    pattern = os.path.join(glob.escape(root), "**", f"*{SOURCE_EXTENSION}")
+    jobs = [
+        (source, name)
+        for source in sorted(glob.iglob(pattern, recursive=True))
+        for name in RENDITIONS
+        if not is_fresh(source, rendition_path(source, name))
+    ]
+    removed = remove_orphans(root)
+    log.info(
+        f"🎵 Priprava {len(jobs)} različic pesmi "
+        f"(odstranjenih {removed} osirotelih)"
+    )
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        done = sum(pool.map(lambda job: transcode(*job), jobs))
+    log.info(f"✅ Pripravljenih {done} od {len(jobs)} različic pesmi")
+    return done
@@ -1,13 +1,26 @@
+import argparse
 import logging
 
 from movies_preparation import FILMS_ROOT, check_folder, is_ffmpeg_installed
+from movies_preparation.catalog import build_catalog
 
 log = logging.getLogger(__name__)
 
 if __name__ == "__main__":
-    if is_ffmpeg_installed():
+    parser = argparse.ArgumentParser(description="Priprava filmov MarinKino")
+    parser.add_argument(
+        "--catalog-only",
+        action="store_true",
+        help="samo na novo zgradi katalog filmov za strežnik",
+    )
+    args = parser.parse_args()
+
+    if args.catalog_only:
+        build_catalog(FILMS_ROOT)
+    elif is_ffmpeg_installed():
         # scrappe_chosen()
-        all_films = check_folder(FILMS_ROOT, only_collect_metadata=False)
+        check_folder(FILMS_ROOT, only_collect_metadata=False)
+        build_catalog(FILMS_ROOT)
         log.info("\n✅ Končano!\n")
     else:
         log.error("❌ FFmpeg ni nameščen! Namesti ga in poskusi znova.")
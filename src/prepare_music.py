@@ -0,0 +1,25 @@
+import argparse
+import logging
+import shutil
+
+from music_renditions import MUSIC_ROOT, prepare_renditions
+from radio_hls import package_stories
+
+log = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Priprava glasbe MarinKino")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="število hkratnih pretvorb (privzeto število jeder)",
+    )
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg"):
+        prepare_renditions(MUSIC_ROOT, workers=args.workers)
+        package_stories(workers=args.workers)
+    else:
+        log.error("❌ FFmpeg ni nameščen! Namesti ga in poskusi znova.")
@@ -0,0 +1,140 @@
+"""
+Pakiranje dolgih radijskih zgodb v HLS.
+
+Dolga zgodba kot ena velika MP3 datoteka (VBR) se slabo previja: odjemalec
+mora ugibati odmike bajtov in pogosto prenese precej več, kot posluša.
+`prepare_music.py` zato zgodbe, daljše od `HLS_MIN_SECONDS` (trajanje je v
+indeksu oznak, glej `music_index`), razreže na kratke odseke AAC v mapi ob
+izvirniku (`zgodba.hls/index.m3u8`). Predvajalnik uporabi HLS, kadar ga
+brskalnik zna predvajati, sicer pa izvirni MP3.
+"""
+
+import glob
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from music_index import STORIES_INDEX_FILE, STORIES_ROOT, MusicIndex
+
+log = logging.getLogger(__name__)
+
+HLS_MIN_SECONDS = int(os.getenv("HLS_MIN_SECONDS", "600"))
+HLS_SEGMENT_SECONDS = 10
+HLS_SUFFIX = ".hls"
+PLAYLIST_NAME = "index.m3u8"
+
+
+def hls_folder(source):
+    """Mapa z odseki HLS ob izvirniku `source` (zgodba.mp3 -> zgodba.hls)."""
+    return os.path.splitext(source)[0] + HLS_SUFFIX
+
+
+def playlist_path(source):
+    return f"{hls_folder(source)}/{PLAYLIST_NAME}"
+
+
+def is_packaged(source):
+    """Ali ima zgodba seznam predvajanja, novejši od izvirnika."""
+    try:
+        return (
+            os.stat(playlist_path(source)).st_mtime_ns
+            >= os.stat(source).st_mtime_ns
+        )
+    except OSError:
+        return False
+
+
+def remove_package(source):
+    if not source.endswith(".mp3"):
+        return
+    shutil.rmtree(hls_folder(source), ignore_errors=True)
+
+
+def package_story(source):
+    """Pripravi HLS v začasni mapi in jo nato zamenja s prejšnjo."""
+    folder = hls_folder(source)
+    parent, name = os.path.split(folder)
+    tmp_folder = os.path.join(parent, f".{name}.tmp")
+    old_folder = os.path.join(parent, f".{name}.old")
+    for leftover in (tmp_folder, old_folder):
+        shutil.rmtree(leftover, ignore_errors=True)
+    os.makedirs(tmp_folder)
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-y",
+        "-v",
+        "error",
+        "-i",
+        source,
+        "-map",
+        "0:a:0",
+        "-c:a",
+        "aac",
+        "-b:a",
+        "64k",
+        "-f",
+        "hls",
+        "-hls_time",
+        str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_type",
+        "fmp4",
+        "-hls_fmp4_init_filename",
+        "init.mp4",
+        "-hls_segment_filename",
+        os.path.join(tmp_folder, "seg%05d.m4s"),
+        os.path.join(tmp_folder, PLAYLIST_NAME),
+    ]
+    try:
+        subprocess.run(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+        if os.path.exists(folder):
+            os.replace(folder, old_folder)
+        os.replace(tmp_folder, folder)
+        shutil.rmtree(old_folder, ignore_errors=True)
+        return True
+    except (OSError, subprocess.CalledProcessError) as e:
+        log.error(f"❌ Napaka pri pakiranju {source} v HLS: {e}")
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        return False
+
+
+def remove_orphans(root=STORIES_ROOT):
+    """Odstrani mape HLS zgodb, katerih izvirnika ni več."""
+    removed = 0
+    pattern = os.path.join(glob.escape(root), "**", f"*{HLS_SUFFIX}")
+    for folder in glob.iglob(pattern, recursive=True):
+        if not os.path.exists(folder[: -len(HLS_SUFFIX)] + ".mp3"):
+            shutil.rmtree(folder, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def package_stories(
+    root=STORIES_ROOT, index_file=STORIES_INDEX_FILE, workers=None
+):
+    """Vzporedno zapakira dolge zgodbe, ki še nimajo svežega HLS."""
+    stories = MusicIndex(root, index_file).refresh()
+    sources = [
+        os.path.join(root, rel)
+        for rel, tags in stories.items()
+        if tags.get("duration", 0) >= HLS_MIN_SECONDS
+    ]
+    jobs = [source for source in sources if not is_packaged(source)]
+    removed = remove_orphans(root)
+    log.info(
+        f"📻 Pakiranje {len(jobs)} od {len(sources)} dolgih zgodb v HLS "
+        f"(odstranjenih {removed} osirotelih)"
+    )
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        done = sum(pool.map(package_story, jobs))
+    log.info(f"✅ Zapakiranih {done} od {len(jobs)} zgodb")
+    return done
@@ -0,0 +1,29 @@
+// Strani bloga za anonimne obiskovalce so v predpomnilniku brez žetona CSRF.
+// Žeton se prenese šele ob oddaji obrazca in vpiše v obrazec ter v meta oznako.
+function pridobiCsrfZeton() {
+    return fetch('/blog/csrf-token', { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(data => {
+            document.querySelector('meta[name="csrf-token"]').setAttribute('content', data.csrf_token);
+            return data.csrf_token;
+        });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('form').forEach(form => {
+        const input = form.querySelector('input[name="csrf_token"]');
+        if (!input) {
+            return;
+        }
+        form.addEventListener('submit', event => {
+            if (input.value) {
+                return;
+            }
+            event.preventDefault();
+            pridobiCsrfZeton().then(token => {
+                input.value = token;
+                form.submit();
+            });
+        });
+    });
+});
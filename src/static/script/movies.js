@@ -20,7 +20,7 @@ function odstraniMovieCard(event, form) {
     return false;
 }
 
-let currentPage = 0;
+let nextCursor = 0;
 let loading = false;
 
 // CSRF token
@@ -83,7 +83,7 @@ async function loadNextPage() {
     if (loading) return;
     loading = true;
 
-    const response = await fetch(`/movies/page?page=${currentPage}`);
+    const response = await fetch(`/movies/page?cursor=${nextCursor}`);
     const data = await response.json();
 
     data.movies.forEach(movie => {
@@ -93,7 +93,7 @@ async function loadNextPage() {
     });
 
     if (data.has_more) {
-        currentPage += 1;
+        nextCursor = data.cursor;
         loading = false;
     }
 }
@@ -269,21 +269,60 @@ document.addEventListener("DOMContentLoaded", function () {
 
     // Nastavi interval (v milisekundah)
     const intervalMillis = 20 * 1000;
+    // Tike napredka zbiramo in jih pošljemo skupaj vsakih nekaj tikov
+    const ticksPerFlush = 3;
     const csrfToken = document.querySelector('meta[name="csrf-token"]').getAttribute('content');
+    let progressTicks = [];
+
+    function queueProgressTick() {
+        progressTicks.push({
+            filename: video.currentSrc,
+            currentTime: video.currentTime,
+            duration: video.duration
+        });
+    }
+
+    function flushProgress(useBeacon) {
+        if (progressTicks.length === 0) return;
+        const ticks = progressTicks;
+        progressTicks = [];
+        if (useBeacon && navigator.sendBeacon) {
+            // sendBeacon ne more nastaviti glave, zato gre žeton v obrazec
+            const form = new FormData();
+            form.append("csrf_token", csrfToken);
+            form.append("ticks", JSON.stringify(ticks));
+            navigator.sendBeacon("/movies/video-progress/batch", form);
+            return;
+        }
+        fetch("/movies/video-progress/batch", {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": csrfToken
+            },
+            body: JSON.stringify({ ticks: ticks })
+        }).catch(() => {});
+    }
+
+    video.addEventListener("pause", () => {
+        if (!video.ended && video.currentSrc) {
+            queueProgressTick();
+        }
+        flushProgress(false);
+    });
+    document.addEventListener("visibilitychange", () => {
+        if (document.visibilityState === "hidden") {
+            flushProgress(true);
+        }
+    });
+    window.addEventListener("pagehide", () => flushProgress(true));
+
     setInterval(() => {
             if (video && !video.paused && !video.ended) {
-                fetch("/movies/video-progress", {
-                    method: "POST",
-                    headers: {
-                        "Content-Type": "application/json",
-                        "X-CSRFToken": csrfToken
-                    },
-                    body: JSON.stringify({
-                        filename: video.currentSrc,
-                        currentTime: video.currentTime,
-                        duration: video.duration
-                    })
-                }).catch(() => {});
+                queueProgressTick();
+                if (progressTicks.length >= ticksPerFlush) {
+                    flushProgress(false);
+                }
                 const selectedButton = document.querySelector('.video-btn.selected');
                 if (selectedButton) {
                     selectedButton.style.setProperty('--watch', Math.round(video.currentTime / video.duration * 100) + '%');
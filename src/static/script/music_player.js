@@ -3,14 +3,9 @@ let music_metadata = {};
 
 const albumsRoot = document.getElementById("albums-root");
 const metadataRoot = document.getElementById("metadata-root");
+// Glasba se nalaga prek JSON API-ja (albumi in strani pesmi albuma)
+const musicApi = albumsRoot && albumsRoot.dataset ? albumsRoot.dataset.api : null;
 
-if (albumsRoot && albumsRoot.dataset && albumsRoot.dataset.albums) {
-    try {
-        albums = JSON.parse(albumsRoot.dataset.albums);
-    } catch (e) {
-        albums = [];
-    }
-}
 if (metadataRoot && metadataRoot.dataset && metadataRoot.dataset.music) {
     try {
         music_metadata = JSON.parse(metadataRoot.dataset.music);
@@ -27,6 +22,24 @@ if ((!music_metadata || Object.keys(music_metadata).length === 0) && window.RADI
     music_metadata = window.RADIO_STORIES_METADATA;
 }
 
+// Kakovost predvajanja: strežnik izbere različico pesmi glede na piškotka
+// (ob spremembi velja od naslednje pesmi naprej)
+function setMusicCookie(name, value) {
+    document.cookie = `${name}=${value}; path=/music; max-age=31536000; SameSite=Lax`;
+}
+if (document.createElement("audio").canPlayType('audio/ogg; codecs="opus"')) {
+    setMusicCookie("music_opus", "1");
+}
+const qualitySelect = document.getElementById("qualitySelect");
+if (qualitySelect) {
+    qualitySelect.value = localStorage.getItem("musicQuality") || "auto";
+    setMusicCookie("music_quality", qualitySelect.value);
+    qualitySelect.addEventListener("change", () => {
+        localStorage.setItem("musicQuality", qualitySelect.value);
+        setMusicCookie("music_quality", qualitySelect.value);
+    });
+}
+
 const albumListEl = document.getElementById("albumList");
 const trackListEl = document.getElementById("trackList");
 const audio = document.getElementById("audio");
@@ -60,12 +73,36 @@ function renderAlbums() {
     });
 }
 
+// Naloži vse strani pesmi albuma iz API-ja (enkrat na album)
+async function fetchAlbumSongs(album) {
+    if (album["songs"]) return album["songs"];
+    const songs = [];
+    let page = 1;
+    let pages = 1;
+    while (page <= pages) {
+        const response = await fetch(`${musicApi}/albums/${album["id"]}?page=${page}`);
+        if (!response.ok) break;
+        const data = await response.json();
+        data["songs"].forEach(s => {
+            music_metadata[s["file"]] = s;
+            songs.push(s["file"]);
+        });
+        pages = data["pages"];
+        page += 1;
+    }
+    album["songs"] = songs;
+    return songs;
+}
+
 // Load album
-function loadAlbum(album) {
+async function loadAlbum(album) {
     currentAlbum = album["name"];
     localStorage.setItem("album", currentAlbum);
-    currentSongs = album["songs"];
     renderAlbums();
+    const songs = await fetchAlbumSongs(album);
+    // Med nalaganjem je bil morda izbran drug album
+    if (currentAlbum !== album["name"]) return;
+    currentSongs = songs;
 
     if (currentSongs.length === 0) {
         trackListEl.innerHTML = "<i style='color: #999; padding: 20px; text-align: center;'>Ni pesmi v tej zbirki.</i>";
@@ -151,8 +188,7 @@ function playTrack(i) {
     updateMediaSession(title, artist, album);
 
     // 1. Nastavi vir
-    const mediaBase = window.MEDIA_FILE_BASE || "/music/file/";
-    audio.src = mediaBase + currentTrack;
+    audio.src = trackSource(currentTrack);
 
     // 2. Samo enkrat naloži
     audio.load();
@@ -180,6 +216,16 @@ function playTrack(i) {
     scrollToActiveTrack();
 }
 
+// Dolge zgodbe imajo lahko HLS; brez podpore v brskalniku ostane MP3
+const canPlayHls = audio.canPlayType("application/vnd.apple.mpegurl") !== "";
+
+function trackSource(track) {
+    const mediaBase = window.MEDIA_FILE_BASE || "/music/file/";
+    const trackMetadata = music_metadata[track] || {};
+    if (trackMetadata["hls"] && canPlayHls) return mediaBase + trackMetadata["hls"];
+    return mediaBase + track;
+}
+
 // Ločena funkcija za Media Session (da je koda bolj čista)
 function updateMediaSession(title, artist, album) {
     if ("mediaSession" in navigator) {
@@ -379,7 +425,7 @@ progress.addEventListener("input", () => {
 audio.onloadedmetadata = () => {
     progress.max = audio.duration;
     try {
-        if (currentTime && audio.src.includes(currentTrack)) audio.currentTime = currentTime;
+        if (currentTime && audio.src.includes(trackSource(currentTrack))) audio.currentTime = currentTime;
     } catch (e) {
         // ignore
     }
@@ -433,16 +479,24 @@ audio.addEventListener('playing', () => {
     albumCover.style.opacity = "1";
 });
 
-let initialAlbum = albums[0];
-albums.forEach(a => {
-    if (a["name"] === currentAlbum) {
-        initialAlbum = a;
+// Initialize
+async function initPlayer() {
+    if (musicApi) {
+        const response = await fetch(`${musicApi}/albums`);
+        albums = response.ok ? (await response.json())["albums"] : [];
     }
-});
+    let initialAlbum = albums[0];
+    albums.forEach(a => {
+        if (a["name"] === currentAlbum) {
+            initialAlbum = a;
+        }
+    });
+    if (!initialAlbum) return;
 
-// Initialize
-loadAlbum(initialAlbum);
-if (currentSongs.length > 0) playTrack(currentIndex || 0);
+    await loadAlbum(initialAlbum);
+    if (currentSongs.length > 0) playTrack(currentIndex || 0);
+}
+initPlayer();
 
 // ======== ISKANJE ========
 const searchInput = document.getElementById("searchInput");
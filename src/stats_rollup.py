@@ -0,0 +1,351 @@
+"""
+Vnaprej izračunani povzetki statistike za nadzorno ploščo.
+
+Surovi števci (`stats:daily:*`, `stats:monthly:*`, `stats:referrer:*`,
+`stats:geo:*`) se v ozadju strnejo v en JSON povzetek na dan
+(`stats:rollup:day:{datum}`) in na mesec (`stats:rollup:month:{mesec}`).
+Pretekli dnevi in meseci se ne spreminjajo več, zato se izračunajo le
+enkrat; sproti se osvežujeta samo današnji dan in tekoči mesec.
+
+Nadzorna plošča tako prebere največ `ROLLUP_DAYS` dnevnih in nekaj
+mesečnih ključev, ne glede na število uporabnikov in poti.
+
+Statistika ogledov (`prog:*`) se izračuna v enem prehodu s SCAN in
+cevovodom ter za `WATCH_STATS_TTL` sekund shrani v `stats:watch`.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import date, timedelta
+
+from blog_views import merge_readers
+from utils import STATS_TTL, decode_progress, redis_client
+
+log = logging.getLogger(__name__)
+
+ROLLUP_DAYS = STATS_TTL // 86400
+DAY_KEY = "stats:rollup:day:{}"
+MONTH_KEY = "stats:rollup:month:{}"
+MONTHS_KEY = "stats:rollup:months"
+TOP_USER_ROUTES = 10
+WATCH_STATS_KEY = "stats:watch"
+WATCH_STATS_TTL = 60
+TOP_MOVIES = 20
+
+
+def rollup_dates(today=None):
+    today = today or date.today()
+    return [
+        (today - timedelta(days=i)).isoformat() for i in range(ROLLUP_DAYS)
+    ]
+
+
+def empty_day():
+    return {
+        "routes": {},
+        "users": {},
+        "user_totals": {},
+        "referrers": {},
+        "geo": {},
+        "geo_cities": {},
+    }
+
+
+def add_daily_counts(day, key, routes_data):
+    """Prišteje en ključ stats:daily:{datum}:{uporabnik}:{status}."""
+    parts = key.split(":")
+    user_id = parts[3]
+    status = parts[4][0] + "xx"
+    user = (
+        day["users"]
+        .setdefault(status, {})
+        .setdefault(user_id, {"count": 0, "routes": {}})
+    )
+    for route_method, count in routes_data.items():
+        count = int(count)
+        user["routes"][route_method] = (
+            user["routes"].get(route_method, 0) + count
+        )
+        user["count"] += count
+        if status.startswith("2") or status.startswith("3"):
+            day["user_totals"][user_id] = (
+                day["user_totals"].get(user_id, 0) + count
+            )
+            route = "/" + "/".join(route_method.split("/")[1:2])
+            day["routes"][route] = day["routes"].get(route, 0) + count
+
+
+def add_geo_counts(day, geo_data):
+    for location_json in geo_data.values():
+        try:
+            location = json.loads(location_json)
+        except ValueError:
+            continue
+        country = location.get("country", "Unknown")
+        city_key = f"{location.get('city', 'Unknown')} ({country})"
+        label = city_key if country == "SI" else country
+        day["geo"][label] = day["geo"].get(label, 0) + 1
+        city = day["geo_cities"].setdefault(city_key, {"count": 0})
+        city["count"] += 1
+        geolocation = (location.get("geolocation") or "").split(",")
+        if len(geolocation) == 2:
+            try:
+                city["geolocation"] = [float(g) for g in geolocation]
+            except ValueError:
+                pass
+
+
+def finish_day(day):
+    """Poti uporabnikov skrči na besedilo z največ TOP_USER_ROUTES poti."""
+    for users in day["users"].values():
+        for user in users.values():
+            user["routes"] = "\n".join(
+                f"{count}x {route_method}"
+                for count, route_method in sorted(
+                    [(c, r) for r, c in user["routes"].items()],
+                    reverse=True,
+                )[:TOP_USER_ROUTES]
+            )
+    return day
+
+
+def rollup_days(dates):
+    """Izračuna in shrani povzetke za podane dneve."""
+    dates = set(dates)
+    if not dates:
+        return {}
+    days = {d: empty_day() for d in dates}
+
+    # Za nekaj dni je ciljan SCAN hitrejši od enega prehoda čez vse ključe.
+    patterns = (
+        [f"stats:daily:{d}:*" for d in dates]
+        if len(dates) <= 2
+        else ["stats:daily:*"]
+    )
+    daily_keys = [
+        key
+        for pattern in patterns
+        for key in redis_client.scan_iter(pattern, count=1000)
+        if len(key.split(":")) >= 5 and key.split(":")[2] in dates
+    ]
+    pipe = redis_client.pipeline(transaction=False)
+    for key in daily_keys:
+        pipe.hgetall(key)
+    for key, routes_data in zip(daily_keys, pipe.execute()):
+        add_daily_counts(days[key.split(":")[2]], key, routes_data)
+
+    ordered = sorted(dates)
+    pipe = redis_client.pipeline(transaction=False)
+    for d in ordered:
+        pipe.hgetall(f"stats:referrer:{d}")
+        pipe.hgetall(f"stats:geo:{d}")
+    results = pipe.execute()
+    for i, d in enumerate(ordered):
+        referrers, geo_data = results[2 * i], results[2 * i + 1]
+        days[d]["referrers"] = {k: int(v) for k, v in referrers.items()}
+        add_geo_counts(days[d], geo_data)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for d, day in days.items():
+        pipe.set(DAY_KEY.format(d), json.dumps(finish_day(day)), ex=STATS_TTL)
+    pipe.execute()
+
+    # Bralci objav bloga iz dnevnih HyperLogLogov (pred njihovim iztekom)
+    merge_readers(dates)
+    return days
+
+
+def rollup_months(months):
+    """Poti iz stats:monthly:{mesec}, strnjene na prvi dve ravni."""
+    months = sorted(set(months))
+    if not months:
+        return {}
+    pipe = redis_client.pipeline(transaction=False)
+    for month in months:
+        pipe.hgetall(f"stats:monthly:{month}")
+    rollups = {}
+    for month, monthly_data in zip(months, pipe.execute()):
+        routes = {}
+        for route_method, count in monthly_data.items():
+            route = "/" + "/".join(route_method.split("/")[1:3])
+            routes[route] = routes.get(route, 0) + int(count)
+        rollups[month] = routes
+
+    pipe = redis_client.pipeline(transaction=False)
+    for month, routes in rollups.items():
+        pipe.set(MONTH_KEY.format(month), json.dumps(routes))
+    pipe.sadd(MONTHS_KEY, *rollups)
+    pipe.execute()
+    return rollups
+
+
+def refresh_rollups(today=None):
+    """Osveži današnji in včerajšnji dan (ter njuna meseca) in dopolni
+    manjkajoče povzetke. Včerajšnji se ponovi, da zajame zadnje zapise
+    pred polnočjo."""
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    dates = rollup_dates(today)
+    pipe = redis_client.pipeline(transaction=False)
+    for d in dates:
+        pipe.exists(DAY_KEY.format(d))
+    missing = [d for d, exists in zip(dates, pipe.execute()) if not exists]
+    rollup_days(set(missing) | {today.isoformat(), yesterday.isoformat()})
+
+    known_months = redis_client.smembers(MONTHS_KEY)
+    months = {today.strftime("%Y-%m"), yesterday.strftime("%Y-%m")}
+    if not known_months:
+        months |= {
+            key.split(":")[-1]
+            for key in redis_client.scan_iter("stats:monthly:*", count=1000)
+        }
+    rollup_months(months)
+
+
+def load_day_rollups(today=None):
+    """Vrne {datum: povzetek} za dneve, ki imajo povzetek."""
+    dates = rollup_dates(today)
+    values = redis_client.mget([DAY_KEY.format(d) for d in dates])
+    return {d: json.loads(v) for d, v in zip(dates, values) if v}
+
+
+def load_month_rollups():
+    months = sorted(redis_client.smembers(MONTHS_KEY))
+    if not months:
+        return {}
+    values = redis_client.mget([MONTH_KEY.format(m) for m in months])
+    return {m: json.loads(v) for m, v in zip(months, values) if v}
+
+
+def seconds_to_str(seconds):
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    return f"{hours}h {minutes:02}m"
+
+
+def scan_progress(batch=500):
+    """Vrača (uporabnik, {datoteka: napredek}) po paketih SCAN + HGETALL."""
+    keys = []
+    for key in redis_client.scan_iter("prog:*", count=batch):
+        keys.append(key)
+        if len(keys) == batch:
+            yield from _hgetall_batch(keys)
+            keys = []
+    if keys:
+        yield from _hgetall_batch(keys)
+
+
+def _hgetall_batch(keys):
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hgetall(key)
+    for key, user_data in zip(keys, pipe.execute()):
+        yield key.split(":")[1], user_data
+
+
+def compute_watch_stats():
+    """Statistika uporabnikov in najbolj gledanih filmov v enem prehodu."""
+    users_stats = {}
+    movies = {}
+    for user_id, user_data in scan_progress():
+        total_watch_time = 0
+        ratio_sum = 0
+        watched_count = 0
+        starting_count = 0
+        last_start_time = "-"
+
+        for video_file, value in user_data.items():
+            progress = decode_progress(value)
+            watch_time = progress.get("total_play_time", 0)
+            duration = progress.get("duration", 0)
+            if not watch_time or not duration:
+                continue
+            ratio = (watch_time / duration) * 100
+            if ratio < 5:
+                continue
+
+            ratio_sum += ratio
+            starting_count += 1
+            if ratio >= 70:
+                watched_count += 1
+            start = progress.get("last_start_time")
+            if start and (last_start_time == "-" or start > last_start_time):
+                last_start_time = start
+            total_watch_time += watch_time
+
+            # Mapa filma je pot do video datoteke brez imena datoteke
+            parts = video_file.split(os.sep)
+            if len(parts) >= 2:
+                movie = movies.setdefault(
+                    os.sep.join(parts[:-1]),
+                    {
+                        "total_ratio": 0,
+                        "count": 0,
+                        "users": set(),
+                        "total_duration": 0,
+                    },
+                )
+                movie["total_ratio"] += ratio
+                movie["count"] += 1
+                movie["users"].add(user_id)
+                movie["total_duration"] += duration
+
+        percent = round(ratio_sum / starting_count, 1) if starting_count else 0
+        users_stats[user_id] = {
+            "Skupen čas": seconds_to_str(total_watch_time),
+            "Število začetih": starting_count,
+            "Število ogledanih": watched_count,
+            "Povprečen delež ogleda": f"{percent} %",
+            "Zadnji začetek ogleda": last_start_time,
+        }
+
+    top_movies = sorted(
+        (
+            {
+                "folder": folder,
+                "total_ratio": round(stats["total_ratio"], 1),
+                "avg_ratio": round(stats["total_ratio"] / stats["count"], 1),
+                "watch_count": stats["count"],
+                "unique_users": len(stats["users"]),
+                "total_watch_hours": round(stats["total_duration"] / 3600, 1),
+            }
+            for folder, stats in movies.items()
+        ),
+        key=lambda x: x["total_ratio"],
+        reverse=True,
+    )[:TOP_MOVIES]
+    return {"users": users_stats, "top_movies": top_movies}
+
+
+def load_watch_stats():
+    """Statistika ogledov iz predpomnilnika ali na novo izračunana."""
+    cached = redis_client.get(WATCH_STATS_KEY)
+    if cached:
+        return json.loads(cached)
+    stats = compute_watch_stats()
+    redis_client.set(WATCH_STATS_KEY, json.dumps(stats), ex=WATCH_STATS_TTL)
+    return stats
+
+
+class StatsRollupWorker(threading.Thread):
+    """Nit, ki ob zagonu in nato v rednih presledkih osveži povzetke."""
+
+    def __init__(self, interval=300):
+        super().__init__(name="stats-rollup", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                refresh_rollups()
+            except Exception:
+                # Ena pokvarjena vrednost ne sme ustaviti niti
+                log.exception("❌ Napaka pri povzemanju statistike")
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop_event.set()
@@ -1,3 +1,4 @@
+import copy
 import json
 import logging
 import os
@@ -5,9 +6,11 @@ import pathlib
 import random
 import smtplib
 import ssl
-from datetime import date
+import tempfile
+import threading
+from datetime import date, datetime, timezone
 from email.message import EmailMessage
-from typing import List
+from typing import Dict, List
 
 import redis
 from flask import session
@@ -21,6 +24,8 @@ redis_client = redis.Redis(
     decode_responses=True,
 )
 
+STATS_TTL = 2592000 * 3  # 90 dni
+
 SUBSCRIBERS_FILE = os.path.join(
     os.path.dirname(__file__), "..", "data", "blog_subscribers.json"
 )
@@ -44,6 +49,111 @@ def save_blog_subscribers(subscribers: List[str]):
         json.dump(subscribers, f, ensure_ascii=False, indent=2)
 
 
+BLOG_POSTS_FILE = os.path.join(
+    os.path.dirname(__file__), "..", "data", "blog_posts.json"
+)
+
+
+class BlogPostStore:
+    """Objave bloga, ki se iz datoteke preberejo le ob njeni spremembi.
+
+    `posts()` vrne skupen slovar, ki ga klicatelji ne smejo spreminjati;
+    `load()` vrne kopijo za urejanje, `save()` pa jo atomarno zapiše
+    (začasna datoteka + preimenovanje) in takoj posodobi predpomnilnik.
+    `version` se poveča ob vsaki spremembi objav.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.normpath(path)
+        self.version = 0
+        self._posts = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def posts(self) -> Dict[str, dict]:
+        signature = self._stat_signature()
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    posts = {}
+                    if signature is not None:
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            posts = json.load(f)
+                    self._posts = posts
+                    self._signature = signature
+                    self.version += 1
+        return self._posts
+
+    def load(self) -> Dict[str, dict]:
+        return copy.deepcopy(self.posts())
+
+    def save(self, posts: Dict[str, dict]):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=directory,
+                prefix=".blog_posts.",
+                suffix=".tmp",
+                delete=False,
+            ) as f:
+                json.dump(posts, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                mode = os.stat(self.path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(f.name, mode)
+            os.replace(f.name, self.path)
+            self._posts = copy.deepcopy(posts)
+            self._signature = self._stat_signature()
+            self.version += 1
+
+
+blog_post_store = BlogPostStore(BLOG_POSTS_FILE)
+
+
+def get_blog_posts() -> Dict[str, dict]:
+    """Objave bloga samo za branje (brez kopiranja)."""
+    return blog_post_store.posts()
+
+
+def post_modified(post):
+    """Čas zadnje spremembe objave (UTC) ali None."""
+    timestamp = (
+        post.get("updated_at")
+        or post.get("published_at")
+        or post.get("created_at")
+        or ""
+    ).replace("Z", "+00:00")
+    try:
+        modified = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    return modified
+
+
+def load_blog_posts() -> Dict[str, dict]:
+    """Kopija objav bloga, ki jo je mogoče spremeniti in shraniti."""
+    return blog_post_store.load()
+
+
+def save_blog_posts(posts: Dict[str, dict]):
+    blog_post_store.save(posts)
+
+
 def safe_path(base_folder, filename):
     path = pathlib.Path(base_folder) / filename
     path = path.resolve()
@@ -170,3 +280,164 @@ def send_mail(
             str(e),
         )
         raise
+
+
+# Napredek ogledov v prog:{user}: vsako polje je ena video datoteka, vrednost
+# pa so številke, ločene s podpičji, v vrstnem redu PROGRESS_FIELDS.
+# last_start_time je zapisan kot število YYYYMMDDHHMM.
+PROGRESS_FIELDS = (
+    "last_play_time",
+    "duration",
+    "total_play_time",
+    "count_start_time",
+    "last_start_time",
+)
+
+
+def progress_field(path):
+    """Ime polja napredka za pot video datoteke (skupina/film/datoteka)."""
+    return "/".join(
+        path.lstrip("/")
+        .replace(".mp4", "")
+        .replace("_Slo", "")
+        .replace("_Eng", "")
+        .split("/")[:3]
+    )
+
+
+def _pack_number(value):
+    return f"{float(value):.1f}".rstrip("0").rstrip(".")
+
+
+def encode_progress(progress: dict) -> str:
+    start = progress.get("last_start_time") or ""
+    start = "".join(c for c in start if c.isdigit())[:12] or 0
+    values = [progress.get(f) or 0 for f in PROGRESS_FIELDS[:-1]] + [start]
+    return ";".join(_pack_number(v) for v in values)
+
+
+def decode_progress(value) -> dict:
+    """Prebere napredek v stisnjeni obliki ali v starejši obliki JSON."""
+    if not value:
+        return {}
+    if value.startswith("{"):
+        return json.loads(value)
+
+    numbers = [float(v) for v in value.split(";")]
+    progress = {
+        name: int(v) if v.is_integer() else v
+        for name, v in zip(PROGRESS_FIELDS[:-1], numbers)
+    }
+    if not progress.get("duration"):
+        progress.pop("duration", None)
+    start = str(int(numbers[-1])) if len(numbers) == 5 else "0"
+    if start != "0":
+        progress["last_start_time"] = (
+            f"{start[:4]}-{start[4:6]}-{start[6:8]}T{start[8:10]}:{start[10:]}"
+        )
+    return progress
+
+
+def get_progress(user_id, fields) -> dict:
+    """Napredek samo za podana polja (en HMGET namesto HGETALL)."""
+    fields = list(dict.fromkeys(fields))
+    if not fields:
+        return {}
+    values = redis_client.hmget(f"prog:{user_id}", fields)
+    return {f: decode_progress(v) for f, v in zip(fields, values) if v}
+
+
+# Atomarna posodobitev napredka: v Redisu prebere zapis (tudi starejši
+# JSON), ga spremeni in zapiše stisnjeno obliko. KEYS[1] = prog:{user},
+# ARGV = polje, način in vrednosti načina:
+#   tick  - trenutni čas, trajanje (prišteje čas ogleda od zadnjega tika)
+#   start - čas začetka YYYYMMDDHHMM (šteje začetke ogledov)
+#   seek  - "0" ali "end", trajanje, če ga zapis še nima
+_PROGRESS_LUA = """
+local function pack(x)
+    local s = string.gsub(string.format("%.1f", x), "%.0$", "")
+    return s
+end
+
+local value = redis.call("HGET", KEYS[1], ARGV[1])
+local p = {0, 0, 0, 0, 0}
+if value and string.sub(value, 1, 1) == "{" then
+    local old = cjson.decode(value)
+    p[1] = tonumber(old["last_play_time"]) or 0
+    p[2] = tonumber(old["duration"]) or 0
+    p[3] = tonumber(old["total_play_time"]) or 0
+    p[4] = tonumber(old["count_start_time"]) or 0
+    if type(old["last_start_time"]) == "string" then
+        local start = string.gsub(old["last_start_time"], "%D", "")
+        p[5] = tonumber(string.sub(start, 1, 12)) or 0
+    end
+elseif value then
+    local i = 1
+    for part in string.gmatch(value, "[^;]+") do
+        p[i] = tonumber(part) or 0
+        i = i + 1
+    end
+end
+
+local mode = ARGV[2]
+if mode == "tick" then
+    local current_time = tonumber(ARGV[3])
+    local from_last = current_time - p[1]
+    if from_last > 0 and from_last < 60 then
+        p[3] = p[3] + from_last
+    end
+    p[1] = current_time
+    p[2] = tonumber(ARGV[4])
+elseif mode == "start" then
+    p[4] = p[4] + 1
+    p[5] = tonumber(ARGV[3])
+elseif mode == "seek" then
+    if p[2] == 0 then
+        p[2] = tonumber(ARGV[4]) or 0
+    end
+    p[1] = ARGV[3] == "end" and p[2] or 0
+else
+    return redis.error_reply("unknown progress mode " .. tostring(mode))
+end
+
+redis.call("HSET", KEYS[1], ARGV[1], table.concat(
+    {pack(p[1]), pack(p[2]), pack(p[3]), pack(p[4]), pack(p[5])}, ";"
+))
+return 1
+"""
+_progress_update = redis_client.register_script(_PROGRESS_LUA)
+
+
+def record_progress_ticks(user_id, ticks):
+    """Zapiše tike predvajanja (polje, čas, trajanje) v enem krogu."""
+    key = f"prog:{user_id}"
+    with redis_client.pipeline(transaction=False) as pipe:
+        for field, current_time, duration in ticks:
+            _progress_update(
+                keys=[key],
+                args=[field, "tick", current_time, duration],
+                client=pipe,
+            )
+        pipe.execute()
+
+
+def record_progress_start(user_id, field):
+    """Prišteje začetek ogleda in zapiše njegov čas."""
+    _progress_update(
+        keys=[f"prog:{user_id}"],
+        args=[field, "start", datetime.now().strftime("%Y%m%d%H%M")],
+    )
+
+
+def set_progress_position(user_id, durations, at_end):
+    """Premakne napredek na začetek ali konec; `durations` je
+    {polje: trajanje} za zapise, ki trajanja še nimajo."""
+    key = f"prog:{user_id}"
+    with redis_client.pipeline(transaction=False) as pipe:
+        for field, duration in durations.items():
+            _progress_update(
+                keys=[key],
+                args=[field, "seek", "end" if at_end else "0", duration],
+                client=pipe,
+            )
+        pipe.execute()
@@ -0,0 +1,296 @@
+"""
+Pretočno ustvarjanje ZIP arhivov brez stiskanja (ZIP_STORED).
+
+Arhiv se nikoli ne sestavi v pomnilniku: `StoredZip` iz velikosti datotek
+vnaprej izračuna natančno postavitev in velikost arhiva. Nato datoteke
+bere po kosih in sproti računa CRC32, ki se zapiše v opisnik podatkov
+(data descriptor) za vsako datoteko in v centralni imenik.
+
+Ker je postavitev vnaprej znana, lahko arhiv pošljemo tudi od poljubnega
+bajta naprej (HTTP Range). Za datoteke, ki jih tak odsek preskoči, se
+CRC32 izračuna vnaprej in shrani v predpomnilnik (pot, velikost, čas
+spremembe). Za zelo velike arhive se uporabi ZIP64.
+"""
+
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+
+CHUNK_SIZE = 1024 * 1024
+ZIP64_LIMIT = 0xFFFFFFFF
+FLAGS = 0x08 | 0x800  # opisnik podatkov, imena v UTF-8
+FILE_ATTRIBUTES = 0o100644 << 16
+
+_crc_cache = {}
+_crc_lock = threading.Lock()
+
+
+def dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday,
+    )
+
+
+def file_crc32(path, size, mtime):
+    """CRC32 datoteke; rezultat se hrani za enako velikost in čas."""
+    key = (path, size, mtime)
+    with _crc_lock:
+        crc = _crc_cache.get(key)
+    if crc is None:
+        crc = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                crc = zlib.crc32(chunk, crc)
+        remember_crc32(key, crc)
+    return crc
+
+
+def remember_crc32(key, crc):
+    with _crc_lock:
+        _crc_cache[key] = crc
+
+
+class ZipEntry:
+    __slots__ = (
+        "name",
+        "path",
+        "data",
+        "size",
+        "mtime",
+        "crc",
+        "offset",
+        "data_offset",
+        "zip64",
+    )
+
+    def __init__(self, name, path=None, data=None, mtime=None):
+        self.name = name.encode("utf-8")
+        self.path = path
+        self.data = data
+        if path is not None:
+            stat = os.stat(path)
+            self.size = stat.st_size
+            self.mtime = int(stat.st_mtime)
+            with _crc_lock:
+                self.crc = _crc_cache.get(self.cache_key)
+        else:
+            self.size = len(data)
+            self.mtime = int(mtime or 0)
+            self.crc = zlib.crc32(data)
+        self.zip64 = self.size >= ZIP64_LIMIT
+        self.offset = 0
+        self.data_offset = 0
+
+    @property
+    def cache_key(self):
+        return (self.path, self.size, self.mtime)
+
+    def local_header(self):
+        dos_time, dos_date = dos_datetime(self.mtime)
+        size = ZIP64_LIMIT if self.zip64 else self.size
+        extra = (
+            struct.pack("<HHQQ", 0x0001, 16, self.size, self.size)
+            if self.zip64
+            else b""
+        )
+        return (
+            struct.pack(
+                "<IHHHHHIIIHH",
+                0x04034B50,
+                45 if self.zip64 else 20,
+                FLAGS,
+                0,
+                dos_time,
+                dos_date,
+                0,
+                size,
+                size,
+                len(self.name),
+                len(extra),
+            )
+            + self.name
+            + extra
+        )
+
+    def descriptor(self):
+        if self.zip64:
+            return struct.pack(
+                "<IIQQ", 0x08074B50, self.crc or 0, self.size, self.size
+            )
+        return struct.pack(
+            "<IIII", 0x08074B50, self.crc or 0, self.size, self.size
+        )
+
+    def central_header(self):
+        dos_time, dos_date = dos_datetime(self.mtime)
+        extra_values = []
+        if self.zip64:
+            extra_values += [self.size, self.size]
+        if self.offset >= ZIP64_LIMIT:
+            extra_values.append(self.offset)
+        extra = (
+            struct.pack(
+                f"<HH{len(extra_values)}Q",
+                0x0001,
+                8 * len(extra_values),
+                *extra_values,
+            )
+            if extra_values
+            else b""
+        )
+        size = ZIP64_LIMIT if self.zip64 else self.size
+        version = 45 if extra_values else 20
+        return (
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50,
+                (3 << 8) | version,
+                version,
+                FLAGS,
+                0,
+                dos_time,
+                dos_date,
+                self.crc or 0,
+                size,
+                size,
+                len(self.name),
+                len(extra),
+                0,
+                0,
+                0,
+                FILE_ATTRIBUTES,
+                min(self.offset, ZIP64_LIMIT),
+            )
+            + self.name
+            + extra
+        )
+
+
+class StoredZip:
+    """ZIP arhiv brez stiskanja z vnaprej znano velikostjo.
+
+    `files` je seznam parov (ime v arhivu, pot), `extra` pa seznam parov
+    (ime v arhivu, bajti) za manjše datoteke, ustvarjene sproti.
+    """
+
+    def __init__(self, files, extra=(), mtime=None):
+        self.entries = [ZipEntry(name, path=path) for name, path in files]
+        self.entries += [
+            ZipEntry(name, data=data, mtime=mtime) for name, data in extra
+        ]
+
+        offset = 0
+        for entry in self.entries:
+            entry.offset = offset
+            entry.data_offset = offset + len(entry.local_header())
+            offset = entry.data_offset + entry.size + len(entry.descriptor())
+        self.central_offset = offset
+        self.size = offset + len(self.central_directory())
+
+    @property
+    def etag(self):
+        """Oznaka, ki se spremeni, če se spremeni katerakoli datoteka."""
+        digest = hashlib.blake2b(digest_size=16)
+        for entry in self.entries:
+            digest.update(entry.name + b"\0")
+            digest.update(f"{entry.size}:{entry.mtime}\0".encode())
+            if entry.data is not None:
+                digest.update(entry.data)
+        return digest.hexdigest()
+
+    def central_directory(self):
+        records = b"".join(entry.central_header() for entry in self.entries)
+        count = len(self.entries)
+        end = self.central_offset + len(records)
+        zip64 = (
+            self.central_offset >= ZIP64_LIMIT
+            or len(records) >= ZIP64_LIMIT
+            or count >= 0xFFFF
+        )
+        if zip64:
+            records += struct.pack(
+                "<IQHHIIQQQQ",
+                0x06064B50,
+                44,
+                45,
+                45,
+                0,
+                0,
+                count,
+                count,
+                len(records),
+                self.central_offset,
+            )
+            records += struct.pack("<IIQI", 0x07064B50, 0, end, 1)
+        return records + struct.pack(
+            "<IHHHHIIH",
+            0x06054B50,
+            0,
+            0,
+            min(count, 0xFFFF),
+            min(count, 0xFFFF),
+            min(end - self.central_offset, ZIP64_LIMIT),
+            min(self.central_offset, ZIP64_LIMIT),
+            0,
+        )
+
+    def _parts(self):
+        for entry in self.entries:
+            yield entry.offset, entry.local_header(), None
+            yield entry.data_offset, entry.size, entry
+            yield entry.data_offset + entry.size, entry.descriptor, None
+        yield self.central_offset, self.central_directory, None
+
+    def iter_bytes(self, start=0, stop=None):
+        """Bajti arhiva v območju [start, stop)."""
+        stop = self.size if stop is None else stop
+        for entry in self.entries:
+            if entry.crc is None and entry.data_offset < start:
+                entry.crc = file_crc32(*entry.cache_key)
+
+        for offset, part, entry in self._parts():
+            if entry is not None:
+                end = offset + part
+            else:
+                if callable(part):
+                    if offset >= stop:
+                        return
+                    part = part()
+                end = offset + len(part)
+            if end <= start:
+                continue
+            if offset >= stop:
+                return
+            lo, hi = max(start, offset) - offset, min(stop, end) - offset
+            if entry is None:
+                yield part[lo:hi]
+            else:
+                yield from self._read_entry(entry, lo, hi)
+
+    def _read_entry(self, entry, lo, hi):
+        if entry.data is not None:
+            yield entry.data[lo:hi]
+            return
+        track_crc = entry.crc is None and lo == 0
+        crc = 0
+        with open(entry.path, "rb") as f:
+            f.seek(lo)
+            remaining = hi - lo
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError(f"{entry.path} se je med prenosom skrajšala")
+                if track_crc:
+                    crc = zlib.crc32(chunk, crc)
+                remaining -= len(chunk)
+                yield chunk
+        if track_crc and hi == entry.size:
+            entry.crc = crc
+            remember_crc32(entry.cache_key, crc)